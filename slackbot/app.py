@@ -4,7 +4,6 @@ Deploy: modal deploy -m slackbot.app
 """
 
 import os
-import threading
 
 import modal
 
@@ -14,14 +13,15 @@ slack_secret = modal.Secret.from_name("slack-secret")
 
 slack_bot_image = (
     modal.Image.debian_slim(python_version="3.12")
-    .pip_install("slack-bolt", "fastapi")
+    # numpy: the non-streaming index path unpickles ChunkBatch results here
+    .pip_install("slack-bolt", "fastapi", "pypdf", "httpx", "numpy")
 )
 
 # These imports register Modal functions/classes on `app` as a side effect.
 from slackbot.index_pipeline import IndexService  # noqa: E402
 from slackbot.ml_agent.service import get_sandbox  # noqa: E402
 from slackbot.rag.service import RagService  # noqa: E402
-from slackbot.router import Router  # noqa: E402
+from slackbot.router import BUSY_REPLY, Dispatcher, IdempotencyCache, Router  # noqa: E402
 
 
 @app.cls(
@@ -37,7 +37,6 @@ class Bot:
     def build(self):
         """Captured in the memory snapshot — only runs on first deploy."""
         from fastapi import FastAPI, Request
-        from fastapi.responses import Response
         from slack_bolt import App as SlackApp
         from slack_bolt.adapter.fastapi import SlackRequestHandler
 
@@ -47,47 +46,60 @@ class Bot:
             ml_sb_fn=get_sandbox,
             vol=rag_vol,
         )
+        self.dispatcher = Dispatcher(self.router.handle)
+        self.events = IdempotencyCache()
 
         slack_app = SlackApp(
             token=os.environ["SLACK_BOT_TOKEN"],
             signing_secret=os.environ["SLACK_SIGNING_SECRET"],
         )
-        _register_slack_handlers(slack_app, self.router)
+        # Slack retries events if no 200 within 3s; the idempotency cache
+        # drops retries of events that were already accepted
+        _register_slack_handlers(slack_app, self.dispatcher, self.events)
 
-        # Slack retries events if no 200 within 3s — drop retries to avoid duplicate handling
         handler = SlackRequestHandler(slack_app)
         self._endpoint = FastAPI()
 
         @self._endpoint.post("/")
         async def root(request: Request):
-            if request.headers.get("x-slack-retry-num"):
-                return Response(status_code=200)
             return await handler.handle(request)
 
     @modal.enter(snap=False)
     def restore(self):
         """Runs on every cold start after restoring from snapshot."""
+        # Worker threads start after restore so they aren't part of the snapshot
+        self.dispatcher.start()
         print("Bot restored from snapshot", flush=True)
 
     @modal.asgi_app()
     def serve(self):
         return self._endpoint
 
+    @modal.method()
+    def stats(self) -> dict:
+        """Dispatch queue depth (total and per channel), wait times, busy rejections and duplicate events."""
+        return {"dispatch": self.dispatcher.metrics(), "events": self.events.stats()}
+
 
 # ── Helpers ──────────────────────────────────────────────────────────────────
 
 
-def _register_slack_handlers(slack_app, router):
+def _register_slack_handlers(slack_app, dispatcher, events):
     """Register Slack event handlers on the bolt app."""
 
-    # Dispatch in a thread so Slack gets 200 within its 3s timeout
+    # Queue for the dispatcher's workers so Slack gets 200 within its 3s timeout
     @slack_app.event("app_mention")
-    def handle_mention(body, client, **_):
-        threading.Thread(
-            target=router.handle,
-            args=(body["event"], client),
-            daemon=True,
-        ).start()
+    def handle_mention(body, client, request, **_):
+        event = body["event"]
+        retry = int((request.headers.get("x-slack-retry-num") or ["0"])[0])
+        if not events.accept(body.get("event_id"), event.get("client_msg_id"), retry=retry):
+            reason = (request.headers.get("x-slack-retry-reason") or ["?"])[0]
+            print(f"[bot] duplicate event {body.get('event_id')} (retry {retry}, {reason}) ignored", flush=True)
+            return
+        if not dispatcher.submit(event, client):
+            client.chat_postMessage(
+                channel=event["channel"], thread_ts=event.get("thread_ts", event["ts"]), text=BUSY_REPLY,
+            )
 
     # Slack sends message events for every channel msg — ignore to avoid 404 noise
     @slack_app.event("message")
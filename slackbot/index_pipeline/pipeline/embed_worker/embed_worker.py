@@ -1,15 +1,37 @@
-"""GPU embedding worker — TEI sidecar, returns chunks to the pipeline."""
+"""GPU embedding worker — TEI sidecar, returns chunks to the pipeline.
+
+Each work unit runs as a three-stage pipeline so neither the CPU nor the
+GPU waits on the other: a process pool parses documents, a thread splits
+them into chunks as they arrive, and the calling thread embeds finished
+chunk batches via TEI.
+"""
+
+import itertools
+import threading
+import time
+from collections import Counter
+from queue import Full, Queue
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from multiprocessing import get_context
 
 import modal
 
 from slackbot.modal_app import app, rag_vol
 
-from .helpers.file_parser import FileParser
-from .tei_server import BATCH_SIZE, PORT, TeiServer
+from ..stream import STREAM_BATCH, put_bounded
+from ..transport import ChunkBatch
+from .helpers.chunker import TokenChunker
+from .helpers.embed_cache import EmbedCache
+from .helpers.file_parser import FileParser, parse_task
+from .tei_server import BATCH_SIZE, TeiClient, TeiServer
 
 WORKERS_PER_GPU = 4
-CHUNK_SIZE = 1024
-CHUNK_OVERLAP = 128
+# CPU cores reserved per container, shared by its WORKERS_PER_GPU inputs
+PARSE_PROCESSES = 8
+# Parse tasks in flight per input — bounds parsed-but-unchunked documents
+PARSE_AHEAD = 2 * PARSE_PROCESSES
+# Chunk batches waiting for TEI per input
+EMBED_AHEAD = 2
 
 # TEI base image + parsing/chunking libs
 embed_image = (
@@ -24,6 +46,7 @@ embed_image = (
         "pypdf",
         "python-docx",
         "httpx",
+        "tokenizers",
     )
     .run_commands("python -c \"import nltk; nltk.download('punkt_tab'); nltk.download('stopwords')\"")
 )
@@ -36,6 +59,7 @@ hf_secret = modal.Secret.from_name("hf-secret")
     volumes={"/data": rag_vol},
     secrets=[hf_secret],
     gpu="A10G",
+    cpu=PARSE_PROCESSES,
     timeout=60 * 60,
     env={
         "HF_HOME": "/data/hf-cache",
@@ -48,43 +72,160 @@ class EmbedWorker:
 
     @modal.enter()
     def _setup(self):
-        import httpx
-        from llama_index.core.node_parser import TokenTextSplitter
-
         self._tei = TeiServer()
         self._tei.start()
-        self._splitter = TokenTextSplitter(chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP)
+        self._chunker = TokenChunker()
         self._parser = FileParser()
-        self._http = httpx.Client(timeout=120.0)
+        self._cache = EmbedCache()
+        # Shared by all concurrent inputs, so in-flight TEI requests are capped per GPU
+        self._tei_client = TeiClient()
+        # spawn, not fork: this process already runs TEI and httpx threads
+        self._pool = ProcessPoolExecutor(PARSE_PROCESSES, mp_context=get_context("spawn"))
+
+    @modal.exit()
+    def _teardown(self):
+        self._pool.shutdown(cancel_futures=True)
+        self._tei_client.close()
+
+    @modal.method()
+    def embed(self, work: dict, worker_id: int) -> tuple[ChunkBatch, int, dict]:
+        """Parse files, chunk, embed via TEI. Returns (chunks, worker_id, stats)."""
+        stats = Counter()
+        chunks = ChunkBatch.concat(list(self._iter_chunks(work, stats)))
+        self._log_stages(worker_id, stats)
+        return chunks, worker_id, dict(stats)
 
     @modal.method()
-    def embed(self, work: dict, worker_id: int) -> tuple[list, int]:
-        """Parse files, chunk, embed via TEI. Returns (chunks, worker_id)."""
-        docs = self._parser.parse(work)
-        chunks = self._chunk_and_embed(docs)
-        return chunks, worker_id
-
-    def _chunk_and_embed(self, docs: list) -> list:
-        """Split docs into chunks and embed via TEI."""
-        nodes = self._splitter.get_nodes_from_documents(docs)
-        if not nodes:
-            return []
+    def embed_stream(self, work: dict, worker_id: int, queue, consumer_id: str | None = None) -> dict:
+        """Parse, chunk and embed, pushing (worker_id, chunks) sub-batches onto queue.
+
+        Blocks while the upsert side is behind, so only a few sub-batches
+        are ever held in memory, and fails if the consumer (the FunctionCall
+        consumer_id) dies meanwhile. Returns stats (chunks sent, cache hits/misses).
+        """
+        consumer = modal.FunctionCall.from_id(consumer_id) if consumer_id else None
+        stats = Counter()
+        for chunks in self._iter_chunks(work, stats):
+            for i in range(0, len(chunks), STREAM_BATCH):
+                put_bounded(queue, (worker_id, chunks[i : i + STREAM_BATCH]), consumer)
+            stats["chunks"] += len(chunks)
+        print(f"  embed-worker-{worker_id}: streamed {stats['chunks']:,} chunks", flush=True)
+        self._log_stages(worker_id, stats)
+        return dict(stats)
+
+    def _iter_chunks(self, work: dict, stats: Counter):
+        """Yield embedded chunks one TEI batch at a time.
+
+        A chunker thread feeds node batches through a bounded queue while
+        this thread embeds them; parsing runs ahead in the process pool.
+        If embedding fails (or the caller stops iterating), the chunker is
+        told to stop and queued parse tasks are cancelled.
+        Busy seconds per stage accumulate in stats as parse_s/chunk_s/embed_s.
+        """
+        nodes_q: Queue = Queue(maxsize=EMBED_AHEAD)
+        stop = threading.Event()
+        chunker = threading.Thread(target=self._chunk_stage, args=(work, nodes_q, stats, stop), daemon=True)
+        chunker.start()
+        try:
+            while (batch := nodes_q.get()) is not None:
+                if isinstance(batch, BaseException):
+                    raise batch
+                start = time.perf_counter()
+                chunks = self._embed_nodes(*batch, stats)
+                stats["embed_s"] += time.perf_counter() - start
+                yield chunks
+        finally:
+            stop.set()
+            chunker.join()
+
+    def _chunk_stage(self, work: dict, nodes_q: Queue, stats: Counter, stop: threading.Event) -> None:
+        """Split parsed docs as they arrive; put (nodes, token lengths) of up to BATCH_SIZE, then None.
+
+        Returns early once stop is set, closing the parse stage.
+        """
+        parsed = self._parse_stage(work, stats)
+        try:
+            pending, lengths = [], []
+            for docs in parsed:
+                start = time.perf_counter()
+                nodes, node_lengths = self._chunker.get_nodes_and_lengths(docs)
+                pending.extend(nodes)
+                lengths.extend(node_lengths)
+                stats["chunk_s"] += time.perf_counter() - start
+                while len(pending) >= BATCH_SIZE:
+                    if not _put(nodes_q, (pending[:BATCH_SIZE], lengths[:BATCH_SIZE]), stop):
+                        return
+                    pending, lengths = pending[BATCH_SIZE:], lengths[BATCH_SIZE:]
+            if pending and not _put(nodes_q, (pending, lengths), stop):
+                return
+            _put(nodes_q, None, stop)
+        except BaseException as e:
+            _put(nodes_q, e, stop)
+        finally:
+            parsed.close()
+
+    def _parse_stage(self, work: dict, stats: Counter):
+        """Yield each task's Documents in completion order, keeping PARSE_AHEAD tasks in flight.
+
+        Tasks not yet started are cancelled when the generator is closed.
+        """
+        tasks = iter(self._parser.tasks(work))
+        in_flight = {self._pool.submit(parse_task, t) for t in itertools.islice(tasks, PARSE_AHEAD)}
+        try:
+            while in_flight:
+                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    docs, busy = future.result()
+                    stats["parse_s"] += busy
+                    yield docs
+                    in_flight.update(self._pool.submit(parse_task, t) for t in itertools.islice(tasks, 1))
+        finally:
+            for future in in_flight:
+                future.cancel()
+
+    def _log_stages(self, worker_id: int, stats: Counter) -> None:
+        print(
+            f"  embed-worker-{worker_id}: busy parse {stats['parse_s']:.1f}s, "
+            f"chunk {stats['chunk_s']:.1f}s, embed {stats['embed_s']:.1f}s",
+            flush=True,
+        )
+
+    def _embed_nodes(self, nodes: list, lengths: list[int], stats: Counter) -> ChunkBatch:
+        """Embed nodes via TEI into a packed ChunkBatch; lengths are their bge token counts."""
         texts = [n.get_content() for n in nodes]
-        embeddings = self._embed_texts(texts)
-        return [
-            (n.node_id, emb, text, n.metadata)
-            for n, emb, text in zip(nodes, embeddings, texts)
-        ]
-
-    def _embed_texts(self, texts: list[str]) -> list[list[float]]:
-        """Batch POST to TEI sidecar."""
-        embeddings: list[list[float]] = []
-        for i in range(0, len(texts), BATCH_SIZE):
-            batch = texts[i : i + BATCH_SIZE]
-            resp = self._http.post(
-                f"http://127.0.0.1:{PORT}/embed",
-                json={"inputs": batch},
-            )
-            resp.raise_for_status()
-            embeddings.extend(resp.json())
-        return embeddings
+        embeddings = self._embed_texts(texts, lengths, stats)
+        return ChunkBatch.from_columns([n.node_id for n in nodes], embeddings, texts, [n.metadata for n in nodes])
+
+    def _embed_texts(self, texts: list[str], lengths: list[int], stats: Counter):
+        """Serve unchanged chunks from the embedding cache, send the rest to TEI.
+
+        lengths (exact token counts from the chunker) drive TEI's batch plan.
+
+        Returns an (n, dim) float32 matrix.
+        """
+        import numpy as np
+
+        embeddings = self._cache.get_many(texts)
+        missing = [i for i, emb in enumerate(embeddings) if emb is None]
+        stats["cache_hits"] += len(texts) - len(missing)
+        stats["cache_misses"] += len(missing)
+        fresh = np.asarray(
+            self._tei_client.embed([texts[i] for i in missing], [lengths[i] for i in missing]), dtype=np.float32,
+        )
+        for i, emb in zip(missing, fresh):
+            embeddings[i] = emb
+        return np.stack(embeddings)
+
+
+# ── Helpers ──────────────────────────────────────────────────────────────────
+
+
+def _put(q: Queue, item, stop: threading.Event, poll: float = 0.25) -> bool:
+    """Put item on a bounded queue unless stop is set first. Returns whether it was put."""
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=poll)
+            return True
+        except Full:
+            continue
+    return False
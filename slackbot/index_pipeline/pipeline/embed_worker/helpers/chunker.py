@@ -0,0 +1,115 @@
+"""Token-accurate chunker using the embedding model's own fast tokenizer.
+
+TokenTextSplitter counts tokens with LlamaIndex's default (tiktoken)
+tokenizer, so its 1024-token chunks run ~2x past bge's 512-token window
+and TEI's --auto-truncate silently drops the tail. This encodes whole
+documents in one Rust batch call and cuts chunks on the model tokenizer's
+character offsets, so every chunk fits the window exactly.
+
+Compare against the old splitter on a document:
+    python -m slackbot.index_pipeline.pipeline.embed_worker.helpers.chunker FILE.pdf
+"""
+
+from ..tei_server import MODEL
+
+# bge-base window is 512 including [CLS] and [SEP]
+CHUNK_TOKENS = 510
+CHUNK_OVERLAP = 64
+# How far a cut may back off to avoid splitting a word into word pieces
+_MAX_BACKOFF = 16
+
+
+class TokenChunker:
+    """Drop-in for TokenTextSplitter.get_nodes_from_documents()."""
+
+    def __init__(self, model: str = MODEL, chunk_tokens: int = CHUNK_TOKENS,
+                 overlap: int = CHUNK_OVERLAP, tokenizer=None):
+        if tokenizer is None:
+            from tokenizers import Tokenizer
+            tokenizer = Tokenizer.from_pretrained(model)
+        tokenizer.no_truncation()
+        tokenizer.no_padding()
+        self._tokenizer = tokenizer
+        self._chunk_tokens = chunk_tokens
+        self._overlap = overlap
+
+    def get_nodes_from_documents(self, docs: list) -> list:
+        return self.get_nodes_and_lengths(docs)[0]
+
+    def get_nodes_and_lengths(self, docs: list) -> tuple[list, list[int]]:
+        """Chunk docs; also return each chunk's bge token count, including [CLS] and [SEP].
+
+        The counts come from the same encoding the cuts are made on, so TEI
+        batches can be planned on exact lengths instead of a chars/token guess.
+        """
+        from llama_index.core.schema import NodeRelationship, TextNode
+
+        encodings = self._tokenizer.encode_batch([d.text for d in docs], add_special_tokens=False)
+        nodes, lengths = [], []
+        for doc, encoding in zip(docs, encodings):
+            for start, end, tokens in self._spans(encoding.offsets):
+                node = TextNode(
+                    text=doc.text[start:end],
+                    metadata=dict(doc.metadata),
+                    excluded_embed_metadata_keys=doc.excluded_embed_metadata_keys,
+                    excluded_llm_metadata_keys=doc.excluded_llm_metadata_keys,
+                )
+                node.relationships[NodeRelationship.SOURCE] = doc.as_related_node_info()
+                nodes.append(node)
+                lengths.append(tokens + 2)
+        return nodes, lengths
+
+    def _spans(self, offsets: list[tuple[int, int]]):
+        """Yield (char_start, char_end, tokens) for windows of at most chunk_tokens tokens."""
+        n = len(offsets)
+        start = 0
+        while start < n:
+            end = min(start + self._chunk_tokens, n)
+            # Prefer cutting at whitespace over splitting a word into word pieces
+            cut = end
+            if end < n:
+                for c in range(end, max(end - _MAX_BACKOFF, start + 1), -1):
+                    if offsets[c][0] > offsets[c - 1][1]:
+                        cut = c
+                        break
+            yield offsets[start][0], offsets[cut - 1][1], cut - start
+            if cut >= n:
+                return
+            start = max(cut - self._overlap, start + 1)
+            # Start the overlap on a word boundary too
+            for s in range(start, min(start + _MAX_BACKOFF, cut)):
+                if offsets[s][0] > offsets[s - 1][1]:
+                    start = s
+                    break
+
+
+def _compare(path: str) -> None:
+    import time
+
+    from llama_index.core import SimpleDirectoryReader
+    from llama_index.core.node_parser import TokenTextSplitter
+
+    docs = SimpleDirectoryReader(input_files=[path]).load_data()
+    chunker = TokenChunker()
+    bge_len = lambda text: len(chunker._tokenizer.encode(text).ids)
+
+    for name, splitter in [
+        ("TokenTextSplitter(1024, 128)", TokenTextSplitter(chunk_size=1024, chunk_overlap=128)),
+        (f"TokenChunker({CHUNK_TOKENS}, {CHUNK_OVERLAP})", chunker),
+    ]:
+        start = time.perf_counter()
+        nodes = splitter.get_nodes_from_documents(docs)
+        elapsed = time.perf_counter() - start
+        lengths = [bge_len(n.get_content()) for n in nodes]
+        over = sum(length > 512 for length in lengths)
+        dropped = sum(max(length - 512, 0) for length in lengths)
+        print(
+            f"{name:<30} {elapsed:7.2f}s  {len(nodes):>6,} chunks  "
+            f"{over:>6,} over 512 bge tokens  {dropped:>9,} tokens truncated by TEI"
+        )
+
+
+if __name__ == "__main__":
+    import sys
+
+    _compare(sys.argv[1])
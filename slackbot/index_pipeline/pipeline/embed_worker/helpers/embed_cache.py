@@ -0,0 +1,85 @@
+"""Content-addressed embedding cache on the rag volume.
+
+Keyed by sha256(model id + chunk text), so an edited document only pays
+TEI time for chunks whose text actually changed. EmbedWorker reads the
+cache; UpsertWorker is the single writer (it already sees every embedding
+and runs with max_inputs=1), which keeps SQLite writes on the volume serial.
+"""
+
+import hashlib
+import sqlite3
+import time
+from pathlib import Path
+
+from ...sqlite_db import connect
+from ..tei_server import MODEL
+
+CACHE_PATH = Path("/data/rag/embed_cache.sqlite")
+# ~3 GB of 768-dim float32 vectors
+MAX_ENTRIES = 1_000_000
+# SQLite's default bound-parameter limit is 999
+_QUERY_BATCH = 500
+
+
+class EmbedCache:
+
+    def __init__(self, path: Path = CACHE_PATH, model: str = MODEL, max_entries: int = MAX_ENTRIES):
+        self._path = path
+        self._model = model
+        self._max_entries = max_entries
+
+    def key(self, text: str) -> str:
+        return hashlib.sha256(f"{self._model}\0{text}".encode()).hexdigest()
+
+    def get_many(self, texts: list[str]) -> list:
+        """Return cached float32 vectors aligned with texts (None for misses)."""
+        import numpy as np
+
+        if not self._path.exists():
+            return [None] * len(texts)
+        keys = [self.key(t) for t in texts]
+        found: dict[str, np.ndarray] = {}
+        with connect(self._path, readonly=True) as conn:
+            for i in range(0, len(keys), _QUERY_BATCH):
+                batch = keys[i : i + _QUERY_BATCH]
+                rows = conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(batch))})",
+                    batch,
+                )
+                for key, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float32)
+        return [found.get(k) for k in keys]
+
+    def put_many(self, texts: list[str], embeddings) -> None:
+        """Insert or refresh entries, then evict least recently written past max_entries.
+
+        Re-putting a cache hit refreshes its timestamp, so eviction is LRU
+        across index runs.
+        """
+        import numpy as np
+
+        now = time.time()
+        rows = [
+            (self.key(t), np.asarray(e, dtype=np.float32).tobytes(), now)
+            for t, e in zip(texts, embeddings)
+        ]
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        with connect(self._path) as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings "
+                "(key TEXT PRIMARY KEY, vector BLOB NOT NULL, used_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS embeddings_used_at ON embeddings (used_at)")
+            conn.executemany("INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?)", rows)
+            self._evict(conn)
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        (count,) = conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+        excess = count - self._max_entries
+        if excess > 0:
+            conn.execute(
+                "DELETE FROM embeddings WHERE key IN "
+                "(SELECT key FROM embeddings ORDER BY used_at LIMIT ?)",
+                (excess,),
+            )
+            print(f"[embed-cache] evicted {excess:,} entries", flush=True)
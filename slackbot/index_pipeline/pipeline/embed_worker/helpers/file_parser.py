@@ -1,9 +1,20 @@
 """Parse files and zip archives into LlamaIndex Documents."""
 
 import io
+import time
 import zipfile
 from pathlib import Path
 
+# Sources are recorded relative to this, so nested folders keep distinct names
+DOCS_DIR = Path("/data/rag/docs")
+# Granularity of parse tasks handed to the process pool
+ZIP_TASK_ENTRIES = 32
+PDF_TASK_PAGES = 16
+# File metadata SimpleDirectoryReader hides from embeddings and the LLM
+_FILE_METADATA_KEYS = [
+    "file_name", "file_type", "file_size", "creation_date", "last_modified_date", "last_accessed_date",
+]
+
 
 class FileParser:
 
@@ -13,12 +24,40 @@ class FileParser:
             return self._parse_files(work["paths"])
         elif work["type"] == "zip_entries":
             return self._parse_zip(work["zip_path"], work["entries"])
+        elif work["type"] == "pdf_pages":
+            return self._parse_pdf_pages(work["path"], work["start"], work["end"])
+        elif work["type"] == "mixed":
+            return [doc for unit in work["units"] for doc in self.parse(unit)]
+        raise ValueError(f"Unknown work type: {work['type']}")
+
+    def tasks(self, work: dict) -> list[dict]:
+        """Split a work unit into small parse tasks for a process pool.
+
+        Each task is itself a work unit — one loose file, a few zip entries
+        or a short page range — so finished documents can stream into
+        chunking while the rest are still being parsed.
+        """
+        if work["type"] == "files":
+            return [{"type": "files", "paths": [p]} for p in work["paths"]]
+        elif work["type"] == "zip_entries":
+            entries = work["entries"]
+            return [
+                {**work, "entries": entries[i : i + ZIP_TASK_ENTRIES]}
+                for i in range(0, len(entries), ZIP_TASK_ENTRIES)
+            ]
+        elif work["type"] == "pdf_pages":
+            return [
+                {**work, "start": i, "end": min(i + PDF_TASK_PAGES, work["end"])}
+                for i in range(work["start"], work["end"], PDF_TASK_PAGES)
+            ]
+        elif work["type"] == "mixed":
+            return [task for unit in work["units"] for task in self.tasks(unit)]
         raise ValueError(f"Unknown work type: {work['type']}")
 
     def _parse_files(self, paths: list[str]) -> list:
         """Parse loose files (PDF, DOCX, plaintext) via SimpleDirectoryReader.
 
-        Each doc gets source (filename) and fingerprint (mtime:size) metadata
+        Each doc gets source (path under DOCS_DIR) and fingerprint (mtime:size) metadata
         so Scanner can detect changes on subsequent runs.
         """
         from llama_index.core import SimpleDirectoryReader
@@ -28,7 +67,7 @@ class FileParser:
             p = Path(path)
             fingerprint = _fingerprint(p)
             for doc in SimpleDirectoryReader(input_files=[path]).load_data():
-                doc.metadata["source"] = p.name
+                doc.metadata["source"] = _source(p)
                 doc.metadata["fingerprint"] = fingerprint
                 docs.append(doc)
         return docs
@@ -50,10 +89,54 @@ class FileParser:
                 if text and text.strip():
                     docs.append(Document(
                         text=text,
-                        metadata={"source": p.name, "filename": name, "fingerprint": fingerprint},
+                        metadata={"source": _source(p), "filename": name, "fingerprint": fingerprint},
                     ))
         return docs
 
+    def _parse_pdf_pages(self, path: str, start: int, end: int) -> list:
+        """Read pages [start, end) of a large PDF, one Document per page.
+
+        BatchBuilder splits big PDFs into ranges across workers (smaller
+        ones go through _parse_files). Text, metadata and excluded keys
+        match what SimpleDirectoryReader's PDF reader produces for the
+        same page, so citations and the manifest don't depend on the split.
+        """
+        from llama_index.core import Document
+        from llama_index.core.readers.file.base import default_file_metadata_func
+        from pypdf import PdfReader
+
+        p = Path(path)
+        file_metadata = {
+            **default_file_metadata_func(path),
+            "source": _source(p),
+            "fingerprint": _fingerprint(p),
+        }
+        reader = PdfReader(path)
+        labels = reader.page_labels
+        docs = []
+        for i in range(start, end):
+            text = reader.pages[i].extract_text() or ""
+            if text.strip():
+                docs.append(Document(
+                    text=text,
+                    metadata={"page_label": labels[i], **file_metadata},
+                    excluded_embed_metadata_keys=list(_FILE_METADATA_KEYS),
+                    excluded_llm_metadata_keys=list(_FILE_METADATA_KEYS),
+                ))
+        return docs
+
+
+def parse_task(task: dict) -> tuple[list, float]:
+    """Process-pool entry point: parse one task, returning (docs, busy seconds)."""
+    start = time.perf_counter()
+    docs = FileParser().parse(task)
+    return docs, time.perf_counter() - start
+
+
+def _source(path: Path) -> str:
+    """Path relative to DOCS_DIR — matches the names Scanner compares against."""
+    return str(path.relative_to(DOCS_DIR)) if path.is_relative_to(DOCS_DIR) else path.name
+
 
 def _fingerprint(path: Path) -> str:
     """mtime_ns:size — stored in ChromaDB metadata for incremental indexing."""
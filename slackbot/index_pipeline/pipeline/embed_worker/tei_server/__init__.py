@@ -1,5 +1,6 @@
 """TEI embedding server subprocess."""
 
+from .client import TeiClient
 from .server import BATCH_SIZE, MODEL, PORT, TeiServer
 
-__all__ = ["BATCH_SIZE", "MODEL", "PORT", "TeiServer"]
+__all__ = ["BATCH_SIZE", "MODEL", "PORT", "TeiClient", "TeiServer"]
@@ -0,0 +1,98 @@
+"""Benchmark TeiClient against the old sequential fixed-size batching.
+
+Runs a local fake TEI server whose "GPU" time is proportional to padded
+tokens (batch size × longest input) and serialised behind a lock, plus a
+fixed per-request overhead outside the lock (HTTP + JSON), which is
+roughly how TEI behaves. No GPU or model download needed:
+
+    python -m slackbot.index_pipeline.pipeline.embed_worker.tei_server.bench
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+
+from .client import TeiClient, estimate_tokens
+from .server import BATCH_SIZE
+
+DIM = 768
+# Fake-GPU cost model
+SECONDS_PER_PADDED_TOKEN = 2e-7
+REQUEST_OVERHEAD_S = 0.01
+
+
+class _FakeTei(BaseHTTPRequestHandler):
+    gpu = threading.Lock()
+
+    def do_POST(self):
+        inputs = json.loads(self.rfile.read(int(self.headers["Content-Length"])))["inputs"]
+        padded = len(inputs) * max(estimate_tokens(t) for t in inputs)
+        with self.gpu:
+            time.sleep(padded * SECONDS_PER_PADDED_TOKEN)
+        time.sleep(REQUEST_OVERHEAD_S)
+        # Echo the input's length in slot 0 so ordering can be checked
+        body = json.dumps([[float(len(t))] + [0.0] * (DIM - 1) for t in inputs]).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *_):
+        pass
+
+
+def _corpus(n: int, seed: int = 0) -> list[str]:
+    """Mostly full-size chunks with a long tail of short ones (page ends, headings)."""
+    rng = random.Random(seed)
+    lengths = [rng.choice([rng.randint(20, 400), rng.randint(3_000, 4_200)]) for _ in range(n)]
+    return ["x" * length for length in lengths]
+
+
+def _sequential(url: str, texts: list[str]) -> list[list[float]]:
+    """The previous EmbedWorker path: BATCH_SIZE texts in document order, one at a time."""
+    out: list[list[float]] = []
+    with httpx.Client(timeout=120.0) as http:
+        for i in range(0, len(texts), BATCH_SIZE):
+            resp = http.post(f"{url}/embed", json={"inputs": texts[i : i + BATCH_SIZE]})
+            resp.raise_for_status()
+            out.extend(resp.json())
+    return out
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--texts", type=int, default=4_096)
+    parser.add_argument("--in-flight", type=int, default=4)
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _FakeTei)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_port}"
+    texts = _corpus(args.texts)
+
+    start = time.perf_counter()
+    baseline = _sequential(url, texts)
+    baseline_s = time.perf_counter() - start
+
+    client = TeiClient(url, max_in_flight=args.in_flight)
+    start = time.perf_counter()
+    bucketed = client.embed(texts)
+    bucketed_s = time.perf_counter() - start
+    client.close()
+    server.shutdown()
+
+    assert [e[0] for e in bucketed] == [e[0] for e in baseline] == [float(len(t)) for t in texts]
+    print(f"texts: {len(texts):,}  batches: {len(client.plan([estimate_tokens(t) for t in texts]))}")
+    print(f"sequential fixed-{BATCH_SIZE}: {baseline_s:6.2f}s  {len(texts) / baseline_s:8,.0f} texts/s")
+    print(f"bucketed, {args.in_flight} in flight: {bucketed_s:6.2f}s  {len(texts) / bucketed_s:8,.0f} texts/s")
+    print(f"speedup: {baseline_s / bucketed_s:.2f}x (order preserved)")
+
+
+if __name__ == "__main__":
+    main()
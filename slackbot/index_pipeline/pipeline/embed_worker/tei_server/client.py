@@ -0,0 +1,105 @@
+"""Async TEI client — length-bucketed, token-budgeted, concurrent requests.
+
+Texts are sorted by length and packed into batches whose padded size
+(count × longest) stays under a token budget, so one long chunk no longer
+forces padding onto 255 short ones. Up to max_in_flight batches are sent
+at once and results are reassembled in input order.
+"""
+
+import asyncio
+import threading
+from typing import Callable
+
+from .server import MAX_BATCH, PORT
+
+MAX_IN_FLIGHT = 4
+# Matches TEI's default --max-batch-tokens
+MAX_BATCH_TOKENS = 16_384
+# Length estimate for callers that don't pass token counts (EmbedWorker passes
+# the chunker's exact ones); off for code and non-English text
+CHARS_PER_TOKEN = 4
+# bge-base window; TEI --auto-truncate cuts anything longer
+MAX_INPUT_TOKENS = 512
+
+
+def estimate_tokens(text: str) -> int:
+    return min(len(text) // CHARS_PER_TOKEN + 2, MAX_INPUT_TOKENS)
+
+
+class TeiClient:
+    """Thread-safe: all callers share one event loop, connection pool and in-flight limit."""
+
+    def __init__(
+        self,
+        url: str = f"http://127.0.0.1:{PORT}",
+        max_in_flight: int = MAX_IN_FLIGHT,
+        max_batch_tokens: int = MAX_BATCH_TOKENS,
+        max_batch: int = MAX_BATCH,
+        length_fn: Callable[[str], int] = estimate_tokens,
+        timeout: float = 120.0,
+    ):
+        self._url = f"{url}/embed"
+        self._max_in_flight = max_in_flight
+        self._max_batch_tokens = max_batch_tokens
+        self._max_batch = max_batch
+        self._length_fn = length_fn
+        self._timeout = timeout
+        self._loop = asyncio.new_event_loop()
+        threading.Thread(target=self._loop.run_forever, daemon=True).start()
+        asyncio.run_coroutine_threadsafe(self._open(), self._loop).result()
+
+    def embed(self, texts: list[str], lengths: list[int] | None = None) -> list[list[float]]:
+        """Embed texts, returning vectors in input order. Blocks the calling thread.
+
+        lengths are the texts' token counts for batch planning; without them
+        length_fn estimates each one.
+        """
+        if not texts:
+            return []
+        return asyncio.run_coroutine_threadsafe(self.aembed(texts, lengths), self._loop).result()
+
+    async def aembed(self, texts: list[str], lengths: list[int] | None = None) -> list[list[float]]:
+        lengths = lengths or [self._length_fn(t) for t in texts]
+        batches = self.plan(lengths)
+        results = await asyncio.gather(*(self._post([texts[i] for i in batch]) for batch in batches))
+        out: list[list[float]] = [None] * len(texts)  # type: ignore[list-item]
+        for batch, embeddings in zip(batches, results):
+            for i, emb in zip(batch, embeddings):
+                out[i] = emb
+        return out
+
+    def plan(self, lengths: list[int]) -> list[list[int]]:
+        """Group text indices into length-sorted batches under the padded token budget."""
+        batches: list[list[int]] = []
+        batch: list[int] = []
+        for i in sorted(range(len(lengths)), key=lengths.__getitem__):
+            # Sorted ascending, so lengths[i] is the padded width if i joins
+            if batch and (
+                (len(batch) + 1) * lengths[i] > self._max_batch_tokens or len(batch) >= self._max_batch
+            ):
+                batches.append(batch)
+                batch = []
+            batch.append(i)
+        if batch:
+            batches.append(batch)
+        return batches
+
+    def close(self) -> None:
+        asyncio.run_coroutine_threadsafe(self._http.aclose(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+
+    async def _open(self) -> None:
+        import httpx
+
+        # Created on the loop thread so the pool and semaphore bind to it
+        self._http = httpx.AsyncClient(
+            timeout=self._timeout,
+            limits=httpx.Limits(max_connections=self._max_in_flight),
+        )
+        self._sem = asyncio.Semaphore(self._max_in_flight)
+
+    async def _post(self, batch: list[str]) -> list[list[float]]:
+        async with self._sem:
+            resp = await self._http.post(self._url, json={"inputs": batch})
+            resp.raise_for_status()
+            return resp.json()
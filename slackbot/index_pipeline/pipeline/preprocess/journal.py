@@ -0,0 +1,70 @@
+"""Append-only change journal for the docs directory.
+
+IndexHandler appends a line per saved file; Scanner reads only the lines
+after its last checkpoint, so an incremental scan stats just the files
+that changed instead of walking the whole tree.
+"""
+
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+JOURNAL_PATH = Path("/data/rag/journal.jsonl")
+CHECKPOINT_PATH = Path("/data/rag/journal.checkpoint.json")
+# Reconcile with a full walk at least this often (catches edits made outside Slack)
+FULL_SCAN_INTERVAL = 24 * 60 * 60
+
+
+class Journal:
+
+    def __init__(self, path: Path = JOURNAL_PATH, checkpoint_path: Path = CHECKPOINT_PATH):
+        self._path = path
+        self._checkpoint_path = checkpoint_path
+        self._lock = threading.Lock()
+
+    def append(self, paths: list[str], op: str = "put") -> None:
+        """Record changed file paths. One write() per call, so lines never interleave."""
+        if not paths:
+            return
+        now = time.time()
+        lines = "".join(json.dumps({"ts": now, "op": op, "path": p}) + "\n" for p in paths)
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            fd = os.open(self._path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                os.write(fd, lines.encode())
+            finally:
+                os.close(fd)
+
+    def read_pending(self) -> tuple[set[str], int]:
+        """Return (paths changed since the checkpoint, journal offset to checkpoint at)."""
+        offset = self._load_checkpoint().get("offset", 0)
+        if not self._path.exists():
+            return set(), offset
+        with open(self._path, "rb") as f:
+            f.seek(offset)
+            data = f.read()
+        # Ignore a trailing partial line; it is picked up next time
+        complete = data[: data.rfind(b"\n") + 1]
+        paths = {json.loads(line)["path"] for line in complete.splitlines() if line.strip()}
+        return paths, offset + len(complete)
+
+    def full_scan_due(self) -> bool:
+        return time.time() - self._load_checkpoint().get("last_full_scan", 0) > FULL_SCAN_INTERVAL
+
+    def checkpoint(self, offset: int, full_scan: bool) -> None:
+        """Mark journal entries up to offset as indexed."""
+        state = self._load_checkpoint()
+        state["offset"] = offset
+        if full_scan:
+            state["last_full_scan"] = time.time()
+        tmp = self._checkpoint_path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(state))
+        tmp.replace(self._checkpoint_path)
+
+    def _load_checkpoint(self) -> dict:
+        if not self._checkpoint_path.exists():
+            return {}
+        return json.loads(self._checkpoint_path.read_text())
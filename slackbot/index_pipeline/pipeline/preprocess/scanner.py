@@ -1,38 +1,148 @@
-"""Document scanner — finds new/changed files via ChromaDB comparison."""
+"""Document scanner — finds new/changed files via the index manifest.
 
+Incremental scans stat only the paths in the change journal; a full,
+recursive walk (directories listed in parallel) runs on first use and
+every FULL_SCAN_INTERVAL to reconcile anything the journal missed.
+"""
+
+import os
+import stat
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from pathlib import Path
 from typing import Callable
 
 from slackbot.modal_app import rag_vol
 
+from .journal import Journal
+
+# Parallel directory listings / stat calls — volume metadata ops are network-bound
+STAT_WORKERS = 32
+
 
 class Scanner:
 
-    def __init__(self, docs_dir: Path, get_indexed: Callable[[], dict[str, str]]):
+    def __init__(self, docs_dir: Path, get_indexed: Callable[[], dict[str, str]], journal: Journal):
         self._docs_dir = docs_dir
         self._get_indexed = get_indexed
+        self._journal = journal
+        self._pending_checkpoint: tuple[int, bool] | None = None
 
-    def scan(self) -> list[str]:
-        """Compare disk fingerprints against ChromaDB, return new/changed files."""
+    def scan(self, full: bool = False) -> tuple[list[str], list[str]]:
+        """Compare disk fingerprints against the manifest.
+
+        Returns (new/changed file paths, indexed sources no longer on disk).
+        Sources are paths relative to docs_dir. Call checkpoint() once the
+        returned files are indexed.
+        """
         rag_vol.reload()
-        if not self._docs_dir.exists():
-            return []
 
-        # {filename: fingerprint} for files already in ChromaDB
+        # {source: fingerprint} for files already indexed
         indexed = self._get_indexed()
 
+        changed, offset = self._journal.read_pending()
+        full = full or self._journal.full_scan_due()
+        if full:
+            on_disk = self._walk()
+            removed = self._confirm_removed(set(indexed) - set(on_disk), walked=bool(on_disk) or not indexed)
+        else:
+            on_disk = self._stat_many([Path(p) for p in changed])
+            # A lost or rolled-back journal can list paths that still exist; check each one
+            removed = self._confirm_removed(
+                {s for s in (self._source(Path(p)) for p in changed) if s in indexed and s not in on_disk}
+            )
+        self._pending_checkpoint = (offset, full)
+
         # Compare each file's current fingerprint against what's indexed
-        all_files = sorted(p for p in self._docs_dir.iterdir() if p.is_file())
-        new_or_changed = [p for p in all_files if indexed.get(p.name) != self._fingerprint(p)]
+        new_or_changed = sorted(s for s, fp in on_disk.items() if indexed.get(s) != fp)
+
+        self._log(new_or_changed, removed, len(on_disk), full)
+        return [str(self._docs_dir / s) for s in new_or_changed], removed
+
+    def checkpoint(self) -> None:
+        """Advance the journal past the last scan's entries."""
+        if self._pending_checkpoint is None:
+            return
+        self._journal.checkpoint(*self._pending_checkpoint)
+        self._pending_checkpoint = None
+        rag_vol.commit()
+
+    def _confirm_removed(self, sources, walked: bool = True) -> list[str]:
+        """Keep the sources that are verifiably gone from docs_dir.
+
+        Reports nothing if docs_dir is missing (e.g. the volume isn't
+        mounted) or a full walk found no files while the manifest lists
+        some, so an empty view never deletes the whole collection.
+        """
+        if not sources:
+            return []
+        if not self._docs_dir.is_dir() or not walked:
+            print(
+                f"[scan] {self._docs_dir} is missing or empty; not removing {len(sources)} indexed file(s)",
+                flush=True,
+            )
+            return []
+        return sorted(s for s in sources if not os.path.lexists(self._docs_dir / s))
+
+    def _walk(self) -> dict[str, str]:
+        """Recursively fingerprint every file under docs_dir, one scandir per task."""
+        found: dict[str, str] = {}
+        if not self._docs_dir.exists():
+            return found
+        with ThreadPoolExecutor(STAT_WORKERS) as pool:
+            pending = {pool.submit(_scan_dir, str(self._docs_dir))}
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    files, subdirs = future.result()
+                    found.update((self._source(Path(p)), fp) for p, fp in files)
+                    pending |= {pool.submit(_scan_dir, d) for d in subdirs}
+        return found
+
+    def _stat_many(self, paths: list[Path]) -> dict[str, str]:
+        """Fingerprint the given paths in parallel, skipping ones that no longer exist."""
+        with ThreadPoolExecutor(STAT_WORKERS) as pool:
+            fingerprints = pool.map(_fingerprint, paths)
+        return {self._source(p): fp for p, fp in zip(paths, fingerprints) if fp is not None}
+
+    def _source(self, path: Path) -> str:
+        return str(path.relative_to(self._docs_dir))
+
+    def _log(self, to_index: list[str], removed: list[str], total: int, full: bool) -> None:
+        print(
+            f"[scan] {'full' if full else 'journal'}: {len(to_index)} to index, "
+            f"{total - len(to_index)} unchanged, {len(removed)} removed",
+            flush=True,
+        )
+        for name in to_index:
+            print(f"[scan]   {name}", flush=True)
+        for name in removed:
+            print(f"[scan]   - {name}", flush=True)
+
+
+# ── Helpers ──────────────────────────────────────────────────────────────────
+
 
-        self._log(new_or_changed, len(all_files))
-        return [str(p) for p in new_or_changed]
+def _scan_dir(path: str) -> tuple[list[tuple[str, str]], list[str]]:
+    """List one directory: ([(file_path, fingerprint)], [subdir_paths]). Skips dotfiles."""
+    files, subdirs = [], []
+    with os.scandir(path) as entries:
+        for entry in entries:
+            if entry.name.startswith("."):
+                continue
+            if entry.is_dir(follow_symlinks=False):
+                subdirs.append(entry.path)
+            elif entry.is_file():
+                st = entry.stat()
+                files.append((entry.path, f"{st.st_mtime_ns}:{st.st_size}"))
+    return files, subdirs
 
-    def _fingerprint(self, path: Path) -> str:
-        stat = path.stat()
-        return f"{stat.st_mtime_ns}:{stat.st_size}"
 
-    def _log(self, to_index: list[Path], total: int) -> None:
-        print(f"[scan] {len(to_index)} to index, {total - len(to_index)} already indexed", flush=True)
-        for p in to_index:
-            print(f"[scan]   {p.name}", flush=True)
+def _fingerprint(path: Path) -> str | None:
+    """mtime_ns:size, or None if the path is gone or not a regular file."""
+    try:
+        st = path.stat()
+    except FileNotFoundError:
+        return None
+    if not stat.S_ISREG(st.st_mode):
+        return None
+    return f"{st.st_mtime_ns}:{st.st_size}"
@@ -0,0 +1,19 @@
+"""SQLite connections for the pipeline's on-volume databases (manifest, embedding cache)."""
+
+import sqlite3
+from contextlib import contextmanager
+from pathlib import Path
+
+
+@contextmanager
+def connect(path: Path, readonly: bool = False):
+    """Open a connection that commits on success and always closes."""
+    if readonly:
+        conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    else:
+        conn = sqlite3.connect(path)
+    try:
+        with conn:
+            yield conn
+    finally:
+        conn.close()
@@ -0,0 +1,65 @@
+"""Bounded Modal queue between embed producers and the upsert consumer.
+
+Embed workers push sub-batches of chunks as they finish; the upsert worker
+drains them. Producers block while the queue is full, so neither side ever
+holds more than MAX_PENDING sub-batches regardless of corpus size. A
+blocked producer gives up once the consumer has exited or nothing has
+drained for MAX_STALL seconds, so a crashed consumer fails the index job
+instead of hanging it.
+"""
+
+import time
+
+# Chunks per queue item — keeps each item well under Modal's per-item size limit
+STREAM_BATCH = 64
+# Queue items allowed in flight before producers block
+MAX_PENDING = 32
+# Put by IndexService once every producer has returned
+STOP = "__STOP__"
+# Seconds a producer waits on a full queue before failing
+MAX_STALL = 10 * 60
+# Seconds between checks that the consumer is still running
+CONSUMER_CHECK_INTERVAL = 5.0
+
+
+def put_bounded(queue, item, consumer=None, max_pending: int = MAX_PENDING, poll: float = 0.25,
+                max_stall: float = MAX_STALL) -> None:
+    """Put item on queue, waiting while the consumer is max_pending items behind.
+
+    consumer is the consumer's modal.FunctionCall. Raises RuntimeError if it
+    has finished (crashed) while the queue is full, TimeoutError after
+    max_stall seconds without room.
+    """
+    start = last_check = time.monotonic()
+    while queue.len() >= max_pending:
+        now = time.monotonic()
+        if now - start > max_stall:
+            raise TimeoutError(f"upsert consumer drained nothing for {max_stall:.0f}s")
+        if consumer is not None and now - last_check >= CONSUMER_CHECK_INTERVAL:
+            last_check = now
+            if _finished(consumer):
+                raise RuntimeError("upsert consumer exited before the stream ended")
+        time.sleep(poll)
+    queue.put(item)
+
+
+def drain(queue, n_values: int = 8):
+    """Yield queue items until STOP is received."""
+    while True:
+        for item in queue.get_many(n_values, block=True):
+            if item == STOP:
+                return
+            yield item
+
+
+def _finished(call) -> bool:
+    """True once a FunctionCall has returned or failed."""
+    import modal.exception
+
+    try:
+        call.get(timeout=0)
+    except (TimeoutError, modal.exception.TimeoutError):
+        return False
+    except Exception:
+        return True
+    return True
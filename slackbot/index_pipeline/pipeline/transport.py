@@ -0,0 +1,106 @@
+"""Packed chunk batches for the EmbedWorker → UpsertWorker hop.
+
+Embeddings travel as one contiguous float32 (or float16) matrix and
+ids/texts/metadatas as parallel columns, instead of a list of
+(id, list[float], text, metadata) tuples. That is 4 (or 2) bytes per
+dimension on the wire rather than ~9 per pickled float, and one array
+object instead of 768 Python floats per chunk.
+
+Compare payload sizes (the round trip is covered by tests/test_transport.py):
+    python -c "from slackbot.index_pipeline.pipeline.transport import _measure; _measure()"
+"""
+
+TRANSPORT_DTYPE = "float32"
+
+
+class ChunkBatch:
+    """Columnar chunks: ids, texts and metadatas lists plus an (n, dim) embedding matrix.
+
+    numpy is imported lazily, so importing this module stays cheap; anything
+    that unpickles a batch (the upsert worker, and the Bot on the
+    non-streaming path) needs numpy installed.
+    """
+
+    def __init__(self, ids: list[str], embeddings, texts: list[str], metadatas: list[dict]):
+        self.ids = ids
+        self.embeddings = embeddings
+        self.texts = texts
+        self.metadatas = metadatas
+
+    @classmethod
+    def from_columns(cls, ids, embeddings, texts, metadatas, dtype: str = TRANSPORT_DTYPE) -> "ChunkBatch":
+        import numpy as np
+
+        matrix = np.asarray(embeddings, dtype=dtype)
+        matrix = matrix.reshape(len(ids), -1) if len(ids) else matrix.reshape(0, 0)
+        return cls(list(ids), matrix, list(texts), list(metadatas))
+
+    @classmethod
+    def concat(cls, batches: list["ChunkBatch"]) -> "ChunkBatch":
+        import numpy as np
+
+        batches = [b for b in batches if len(b)]
+        if not batches:
+            return cls.from_columns([], [], [], [])
+        return cls(
+            [i for b in batches for i in b.ids],
+            np.concatenate([b.embeddings for b in batches]),
+            [t for b in batches for t in b.texts],
+            [m for b in batches for m in b.metadatas],
+        )
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __getitem__(self, s: slice) -> "ChunkBatch":
+        return ChunkBatch(self.ids[s], self.embeddings[s], self.texts[s], self.metadatas[s])
+
+    def float32(self):
+        """Embeddings as float32 — what ChromaDB and the embedding cache store."""
+        return self.embeddings.astype("float32", copy=False)
+
+    def __getstate__(self) -> dict:
+        # Raw buffer instead of pickling the ndarray object
+        return {
+            "ids": self.ids,
+            "texts": self.texts,
+            "metadatas": self.metadatas,
+            "dtype": self.embeddings.dtype.str,
+            "shape": self.embeddings.shape,
+            "data": self.embeddings.tobytes(),
+        }
+
+    def __setstate__(self, state: dict) -> None:
+        import numpy as np
+
+        self.ids = state["ids"]
+        self.texts = state["texts"]
+        self.metadatas = state["metadatas"]
+        self.embeddings = np.frombuffer(state["data"], dtype=state["dtype"]).reshape(state["shape"])
+
+
+def _measure(n: int = 256, dim: int = 768) -> None:
+    import pickle
+
+    import numpy as np
+
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((n, dim)).astype("float32")
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    ids = [f"node-{i:08d}" for i in range(n)]
+    texts = [f"chunk {i}: " + "lorem ipsum " * 300 for i in range(n)]
+    metas = [{"source": "docs/report.pdf", "page_label": str(i), "fingerprint": "1700000000000000000:123456"}
+             for i in range(n)]
+
+    # The previous format: JSON-decoded float lists inside per-chunk tuples
+    legacy = pickle.dumps([(i, v.tolist(), t, m) for i, v, t, m in zip(ids, vectors, texts, metas)])
+    for dtype in ("float32", "float16"):
+        batch = ChunkBatch.from_columns(ids, vectors.tolist(), texts, metas, dtype=dtype)
+        payload = pickle.dumps(batch)
+        emb_legacy = len(pickle.dumps([v.tolist() for v in vectors]))
+        emb_packed = len(pickle.dumps(batch.embeddings.tobytes()))
+        print(
+            f"{dtype}: batch {len(legacy):>10,} -> {len(payload):>10,} bytes "
+            f"({len(legacy) / len(payload):.2f}x); embeddings alone {emb_legacy / (n * dim):.1f} -> "
+            f"{emb_packed / (n * dim):.1f} bytes/dim"
+        )
@@ -1,3 +1,4 @@
+from .manifest import Manifest
 from .upsert_worker import UpsertWorker
 
-__all__ = ["UpsertWorker"]
+__all__ = ["Manifest", "UpsertWorker"]
@@ -0,0 +1,152 @@
+"""Export the ChromaDB collection as a memory-mapped vector index.
+
+Layout of VECTORS_DIR/<generation>/, read by slackbot.rag.db.VectorIndex:
+    vectors.npy    (n, dim) float32, normalized; rows grouped by IVF list
+    chunks.sqlite  row -> chunk id, text, metadata JSON
+    centroids.npy  (nlist, dim) float32 IVF centroids   (IVF only)
+    offsets.npy    (nlist + 1,) int64 row range per list (IVF only)
+
+Each export lands in a directory named after the index generation, so a
+reader opens either the complete old export or the complete new one.
+"""
+
+import json
+import shutil
+import sqlite3
+from contextlib import closing
+from pathlib import Path
+
+from ..sqlite_db import connect
+
+VECTORS_DIR = "/data/rag/vectors"
+EXPORT_PAGE = 5_000
+# Flat scans stay in the low milliseconds below this; above it, partition
+IVF_MIN_VECTORS = 50_000
+# k-means trains on at most this many vectors per list
+IVF_TRAIN_PER_LIST = 64
+IVF_ITERATIONS = 10
+
+
+def export_collection(collection, generation: int, root: str = VECTORS_DIR, ivf: bool | None = None) -> dict:
+    """Write collection's vectors, texts and metadatas under root/<generation>.
+
+    Streams one EXPORT_PAGE at a time: normalized vectors go to an on-disk
+    array and texts/metadatas to chunks.sqlite, so memory holds a page plus
+    per-row IVF bookkeeping, not the collection. ivf=None partitions
+    automatically once the collection has IVF_MIN_VECTORS vectors. Older
+    generations' exports are removed. Returns {"vectors", "dim", "lists", "path"}.
+    """
+    import numpy as np
+
+    total = collection.count()
+    out = Path(root) / f"{generation:08d}"
+    tmp = out.with_suffix(".tmp")
+    shutil.rmtree(tmp, ignore_errors=True)
+    tmp.mkdir(parents=True)
+
+    # Rows in collection order; reordered into IVF lists below
+    unsorted_path = tmp / "unsorted.npy"
+    unsorted, n = None, 0
+    with connect(tmp / "chunks.sqlite") as conn:
+        conn.execute("CREATE TABLE chunks (row INTEGER PRIMARY KEY, id TEXT, text TEXT, metadata TEXT)")
+        for offset in range(0, total, EXPORT_PAGE):
+            page = collection.get(
+                include=["embeddings", "documents", "metadatas"], limit=EXPORT_PAGE, offset=offset,
+            )
+            embeddings = np.asarray(page["embeddings"], dtype=np.float32)
+            if not len(embeddings):
+                break
+            if unsorted is None:
+                unsorted = np.lib.format.open_memmap(
+                    unsorted_path, mode="w+", dtype=np.float32, shape=(total, embeddings.shape[1]),
+                )
+            embeddings /= np.maximum(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12)
+            unsorted[n : n + len(embeddings)] = embeddings
+            conn.executemany(
+                "INSERT INTO chunks VALUES (?, ?, ?, ?)",
+                (
+                    (n + i, chunk_id, text, json.dumps(meta or {}))
+                    for i, (chunk_id, text, meta) in enumerate(
+                        zip(page["ids"], page["documents"], page["metadatas"])
+                    )
+                ),
+            )
+            n += len(embeddings)
+    matrix = unsorted[:n] if unsorted is not None else np.zeros((0, 0), dtype=np.float32)
+    dim = matrix.shape[1]
+
+    if ivf is None:
+        ivf = n >= IVF_MIN_VECTORS
+    order = None
+    lists = 0
+    if ivf and n:
+        centroids, assignment = train_ivf(matrix)
+        lists = len(centroids)
+        order = np.argsort(assignment, kind="stable")
+        offsets = np.searchsorted(assignment[order], np.arange(lists + 1))
+        np.save(tmp / "centroids.npy", centroids)
+        np.save(tmp / "offsets.npy", offsets.astype(np.int64))
+        _reorder_chunks(tmp / "chunks.sqlite", order)
+
+    vectors = np.lib.format.open_memmap(tmp / "vectors.npy", mode="w+", dtype=np.float32, shape=(n, dim))
+    for i in range(0, n, EXPORT_PAGE):
+        rows = order[i : i + EXPORT_PAGE] if order is not None else slice(i, i + EXPORT_PAGE)
+        vectors[i : i + EXPORT_PAGE] = matrix[rows]
+    vectors.flush()
+    del vectors, matrix, unsorted
+    unsorted_path.unlink(missing_ok=True)
+
+    shutil.rmtree(out, ignore_errors=True)
+    tmp.rename(out)
+    for old in Path(root).iterdir():
+        if old != out and old.name < out.name:
+            shutil.rmtree(old, ignore_errors=True)
+    return {"vectors": n, "dim": dim, "lists": lists, "path": str(out)}
+
+
+def train_ivf(matrix, lists: int | None = None, iterations: int = IVF_ITERATIONS, seed: int = 0):
+    """Spherical k-means over normalized rows. Returns (centroids, assignment per row)."""
+    import numpy as np
+
+    n = len(matrix)
+    lists = lists or max(1, int(np.sqrt(n)))
+    rng = np.random.default_rng(seed)
+    sample = matrix[rng.choice(n, size=min(n, lists * IVF_TRAIN_PER_LIST), replace=False)]
+    centroids = sample[rng.choice(len(sample), size=lists, replace=False)].copy()
+    for _ in range(iterations):
+        nearest = _assign(sample, centroids)
+        order = np.argsort(nearest, kind="stable")
+        counts = np.bincount(nearest, minlength=lists)
+        sums = np.zeros_like(centroids)
+        filled = counts > 0
+        sums[filled] = np.add.reduceat(sample[order], np.cumsum(counts)[filled] - counts[filled])
+        empty = ~filled
+        # Re-seed empty lists from random sample rows
+        sums[empty] = sample[rng.choice(len(sample), size=int(empty.sum()))]
+        centroids = sums / np.linalg.norm(sums, axis=1, keepdims=True)
+    return centroids.astype(np.float32), _assign(matrix, centroids)
+
+
+def _assign(matrix, centroids, block: int = 65_536):
+    import numpy as np
+
+    return np.concatenate([
+        np.argmax(matrix[i : i + block] @ centroids.T, axis=1) for i in range(0, len(matrix), block)
+    ]) if len(matrix) else np.zeros(0, dtype=np.int64)
+
+
+def _reorder_chunks(path: Path, order) -> None:
+    """Renumber chunks.sqlite rows so row i is the chunk at order[i]."""
+    with connect(path) as conn:
+        conn.execute("CREATE TEMP TABLE sorted_rows (unsorted INTEGER PRIMARY KEY, row INTEGER)")
+        conn.executemany("INSERT INTO sorted_rows VALUES (?, ?)", ((i, row) for row, i in enumerate(order.tolist())))
+        conn.execute("CREATE TABLE sorted_chunks (row INTEGER PRIMARY KEY, id TEXT, text TEXT, metadata TEXT)")
+        conn.execute(
+            "INSERT INTO sorted_chunks SELECT s.row, c.id, c.text, c.metadata "
+            "FROM chunks c JOIN sorted_rows s ON s.unsorted = c.row ORDER BY s.row"
+        )
+        conn.execute("DROP TABLE chunks")
+        conn.execute("ALTER TABLE sorted_chunks RENAME TO chunks")
+    # Reclaim the dropped table's pages
+    with closing(sqlite3.connect(path)) as conn:
+        conn.execute("VACUUM")
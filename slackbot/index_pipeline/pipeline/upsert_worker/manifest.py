@@ -0,0 +1,163 @@
+"""File-level index manifest — one row per indexed source file.
+
+UpsertWorker updates it in the same step as each ChromaDB write; Scanner
+reads it directly from the volume, so a scan costs O(files), not O(chunks).
+Each file's chunk ids are rows of their own, so recording a batch costs
+O(batch) however many chunks the file already has. Chunk ids from
+replaced or deleted files move to a stale table until UpsertWorker deletes
+them from ChromaDB at the end of the run.
+"""
+
+import json
+import sqlite3
+import time
+from pathlib import Path
+
+from ..sqlite_db import connect
+
+MANIFEST_PATH = Path("/data/rag/manifest.sqlite")
+
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS manifest ("
+    "source TEXT PRIMARY KEY, fingerprint TEXT NOT NULL, chunk_count INTEGER NOT NULL, "
+    "indexed_at REAL NOT NULL);"
+    "CREATE TABLE IF NOT EXISTS chunks ("
+    "source TEXT NOT NULL, chunk_id TEXT NOT NULL, PRIMARY KEY (source, chunk_id)) WITHOUT ROWID;"
+    "CREATE TABLE IF NOT EXISTS stale (chunk_id TEXT PRIMARY KEY)"
+)
+
+
+class Manifest:
+
+    def __init__(self, path: Path = MANIFEST_PATH):
+        self._path = path
+
+    def exists(self) -> bool:
+        return self._path.exists()
+
+    def fingerprints(self) -> dict[str, str]:
+        """Return {source: fingerprint} for every indexed file."""
+        if not self.exists():
+            return {}
+        with connect(self._path, readonly=True) as conn:
+            return dict(conn.execute("SELECT source, fingerprint FROM manifest"))
+
+    def record(self, ids: list[str], metadatas: list[dict]) -> None:
+        """Add freshly upserted chunk ids to their sources.
+
+        A source's chunks can arrive over many writes (zip entries and PDF
+        page ranges are spread across workers), so ids with a matching
+        fingerprint are added to the source's rows; a new fingerprint
+        replaces them and marks the previous version's ids stale.
+        """
+        grouped: dict[str, tuple[str, list[str]]] = {}
+        for chunk_id, meta in zip(ids, metadatas):
+            source, fingerprint = meta.get("source"), meta.get("fingerprint")
+            if source and fingerprint:
+                grouped.setdefault(source, (fingerprint, []))[1].append(chunk_id)
+
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        with connect(self._path) as conn:
+            _ensure_schema(conn)
+            for source, (fingerprint, new_ids) in grouped.items():
+                row = conn.execute("SELECT fingerprint FROM manifest WHERE source = ?", (source,)).fetchone()
+                if row and row[0] != fingerprint:
+                    _drop_chunks(conn, source)
+                if not row or row[0] != fingerprint:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO manifest VALUES (?, ?, 0, ?)", (source, fingerprint, time.time())
+                    )
+                _add_chunks(conn, source, new_ids)
+
+    def remove(self, sources: list[str]) -> None:
+        """Drop rows for files deleted from disk, marking their chunks stale."""
+        if not sources or not self.exists():
+            return
+        with connect(self._path) as conn:
+            _ensure_schema(conn)
+            for source in sources:
+                _drop_chunks(conn, source)
+                conn.execute("DELETE FROM manifest WHERE source = ?", (source,))
+
+    def live_ids(self) -> set[str]:
+        """Every chunk id belonging to a current manifest row."""
+        if not self.exists():
+            return set()
+        with connect(self._path) as conn:
+            _ensure_schema(conn)
+            return {i for (i,) in conn.execute("SELECT chunk_id FROM chunks")}
+
+    def stale_ids(self) -> list[str]:
+        if not self.exists():
+            return []
+        with connect(self._path) as conn:
+            _ensure_schema(conn)
+            return [i for (i,) in conn.execute("SELECT chunk_id FROM stale")]
+
+    def mark_stale(self, ids: list[str]) -> None:
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        with connect(self._path) as conn:
+            _ensure_schema(conn)
+            _mark_stale(conn, ids)
+
+    def clear_stale(self, ids: list[str]) -> None:
+        """Forget stale ids once they have been deleted from ChromaDB."""
+        with connect(self._path) as conn:
+            conn.executemany("DELETE FROM stale WHERE chunk_id = ?", [(i,) for i in ids])
+
+    def rebuild(self, rows: dict[str, tuple[str, list[str]]], stale: list[str] = ()) -> None:
+        """Replace the manifest with {source: (fingerprint, chunk_ids)} and stale ids."""
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        with connect(self._path) as conn:
+            _ensure_schema(conn)
+            conn.execute("DELETE FROM manifest")
+            conn.execute("DELETE FROM chunks")
+            for source, (fingerprint, chunk_ids) in rows.items():
+                conn.execute("INSERT INTO manifest VALUES (?, ?, 0, ?)", (source, fingerprint, time.time()))
+                _add_chunks(conn, source, chunk_ids)
+            _mark_stale(conn, stale)
+
+
+# ── Helpers ──────────────────────────────────────────────────────────────────
+
+
+def _ensure_schema(conn: sqlite3.Connection) -> None:
+    """Create the tables, moving ids out of the old per-source JSON column if present."""
+    columns = {name for _, name, *_ in conn.execute("PRAGMA table_info(manifest)")}
+    migrate = "chunk_ids" in columns
+    if migrate:
+        # One transaction, so an interrupted migration leaves the old table intact
+        conn.execute("BEGIN")
+        conn.execute("ALTER TABLE manifest RENAME TO manifest_json")
+    for statement in _SCHEMA.split(";"):
+        conn.execute(statement)
+    if not migrate:
+        return
+    for source, fingerprint, chunk_ids, indexed_at in conn.execute(
+        "SELECT source, fingerprint, chunk_ids, indexed_at FROM manifest_json"
+    ).fetchall():
+        conn.execute("INSERT INTO manifest VALUES (?, ?, 0, ?)", (source, fingerprint, indexed_at))
+        _add_chunks(conn, source, json.loads(chunk_ids))
+    conn.execute("DROP TABLE manifest_json")
+    print("[manifest] moved chunk ids into the chunks table", flush=True)
+
+
+def _add_chunks(conn: sqlite3.Connection, source: str, chunk_ids: list[str]) -> None:
+    added = conn.executemany(
+        "INSERT OR IGNORE INTO chunks VALUES (?, ?)", [(source, i) for i in chunk_ids]
+    ).rowcount
+    conn.execute(
+        "UPDATE manifest SET chunk_count = chunk_count + ?, indexed_at = ? WHERE source = ?",
+        (added, time.time(), source),
+    )
+
+
+def _drop_chunks(conn: sqlite3.Connection, source: str) -> None:
+    """Mark a source's chunk ids stale and forget them."""
+    conn.execute("INSERT OR IGNORE INTO stale SELECT chunk_id FROM chunks WHERE source = ?", (source,))
+    conn.execute("DELETE FROM chunks WHERE source = ?", (source,))
+    conn.execute("UPDATE manifest SET chunk_count = 0 WHERE source = ?", (source,))
+
+
+def _mark_stale(conn: sqlite3.Connection, ids: list[str]) -> None:
+    conn.executemany("INSERT OR IGNORE INTO stale VALUES (?)", [(i,) for i in ids])
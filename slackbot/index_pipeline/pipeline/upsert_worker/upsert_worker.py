@@ -1,12 +1,25 @@
 """CPU upsert worker — writes embedded chunks to ChromaDB."""
 
+import sqlite3
+from contextlib import closing
 from pathlib import Path
 import modal
-from slackbot.modal_app import app, rag_vol
+from slackbot.modal_app import app, index_state, rag_vol
+
+from ..embed_worker.helpers.embed_cache import EmbedCache
+from ..stream import drain
+from ..transport import ChunkBatch
+from .exporter import export_collection
+from .manifest import Manifest
 
 CHROMA_DIR = "/data/rag/chroma"
 CHROMA_COLLECTION = "rag_documents"
+# Bumped whenever searchable content changes; RagService keys its caches on it
+GENERATION_PATH = "/data/rag/index_generation"
 UPSERT_BATCH = 5_000
+DELETE_BATCH = 5_000
+# Streaming mode flushes smaller batches so writes keep pace with GPU workers
+STREAM_UPSERT_BATCH = 1_024
 
 upsert_image = modal.Image.debian_slim(python_version="3.12").pip_install("chromadb")
 
@@ -27,40 +40,201 @@ class UpsertWorker:
         client = chromadb.PersistentClient(path=CHROMA_DIR)
         # Opens existing collection or creates a new empty one
         self._collection = client.get_or_create_collection(CHROMA_COLLECTION)
+        # Single writer for the embedding cache that EmbedWorker reads
+        self._cache = EmbedCache()
+        self._manifest = Manifest()
 
     @modal.method()
-    def upsert(self, chunks: list, worker_id: int) -> int:
-        """Write chunks to ChromaDB in batches of UPSERT_BATCH.
-
-        Each chunk is (id, embedding, text, metadata) from EmbedWorker.
-        """
+    def upsert(self, chunks: ChunkBatch, worker_id: int) -> int:
+        """Write a worker's ChunkBatch to ChromaDB in batches of UPSERT_BATCH."""
         print(f"  upsert-worker: upserting {len(chunks):,} chunks from worker-{worker_id}...", flush=True)
         for i in range(0, len(chunks), UPSERT_BATCH):
-            batch = chunks[i : i + UPSERT_BATCH]
-            ids, embeddings, documents, metadatas = zip(*batch)
-            self._collection.upsert(
-                ids=list(ids),
-                embeddings=list(embeddings),
-                documents=list(documents),
-                metadatas=list(metadatas),
-            )
+            self._write(chunks[i : i + UPSERT_BATCH])
+        # Durable, but not published: finalize() bumps the generation once per run
+        rag_vol.commit()
         return len(chunks)
 
+    @modal.method()
+    def consume(self, queue) -> int:
+        """Drain (worker_id, ChunkBatch) sub-batches from queue until STOP.
+
+        Buffers up to STREAM_UPSERT_BATCH chunks per ChromaDB write, so
+        memory stays flat while embed workers keep producing.
+        """
+        buffer: list[ChunkBatch] = []
+        buffered = total = 0
+        for _, chunks in drain(queue):
+            buffer.append(chunks)
+            buffered += len(chunks)
+            if buffered >= STREAM_UPSERT_BATCH:
+                self._write(ChunkBatch.concat(buffer))
+                total += buffered
+                buffer, buffered = [], 0
+        if buffer:
+            self._write(ChunkBatch.concat(buffer))
+            total += buffered
+        rag_vol.commit()
+        print(f"  upsert-worker: streamed {total:,} chunks", flush=True)
+        return total
+
     @modal.method()
     def get_indexed_files(self) -> dict[str, str]:
-        """Return {source: fingerprint} for all indexed files.
+        """Return {source: fingerprint} for all indexed files, from the manifest."""
+        return self._manifest.fingerprints()
+
+    @modal.method()
+    def migrate_manifest(self) -> int:
+        """Build the manifest from chunk metadata already in ChromaDB.
+
+        One-off O(chunks) pass for collections indexed before the manifest
+        existed. Where a source was indexed more than once, only the newest
+        fingerprint's chunks are kept; older versions are marked stale.
+        Returns the number of source files recorded.
+        """
+        return self._migrate_manifest()
+
+    @modal.method()
+    def finalize(self, removed: list[str]) -> int:
+        """Replace-on-reindex: delete superseded and removed chunks.
+
+        Runs after every new chunk of the run is committed, so a file's old
+        version stays searchable until its replacement is in place. Publishes
+        the run's single new index generation. Returns the number of vectors
+        deleted.
+        """
+        self._manifest.remove(removed)
+        deleted = self._delete_stale()
+        _commit()
+        print(f"  upsert-worker: deleted {deleted:,} stale chunks ({len(removed)} removed files)", flush=True)
+        return deleted
+
+    @modal.method()
+    def compact(self) -> dict:
+        """Delete stale and orphaned chunks, then VACUUM ChromaDB's SQLite file.
 
-        Used by Scanner to compare disk fingerprints against what's
-        already in ChromaDB, skipping files that haven't changed.
+        Orphans are chunks no manifest row references (e.g. left by a run
+        that crashed before finalize). The manifest is built first if it is
+        missing, and the orphan sweep is skipped if it lists no chunks while
+        the collection has some. Returns vector counts and on-disk bytes
+        before and after.
         """
-        indexed: dict[str, str] = {}
+        try:
+            rag_vol.reload()
+        except Exception as e:
+            # e.g. ChromaDB's files still open; this container is the only writer
+            print(f"  upsert-worker: volume reload failed, compacting current view: {e}", flush=True)
+        if not self._manifest.exists():
+            self._migrate_manifest()
+        vectors_before, bytes_before = self._collection.count(), _dir_size(CHROMA_DIR)
+
+        live = self._manifest.live_ids()
+        if live or not vectors_before:
+            orphans: list[str] = []
+            page_size = 5_000
+            for offset in range(0, vectors_before, page_size):
+                result = self._collection.get(include=[], limit=page_size, offset=offset)
+                orphans.extend(i for i in result["ids"] if i not in live)
+            self._manifest.mark_stale(orphans)
+        else:
+            print(
+                f"  upsert-worker: manifest lists no chunks but the collection has {vectors_before:,}; "
+                "skipping the orphan sweep",
+                flush=True,
+            )
+        deleted = self._delete_stale()
+
+        with closing(sqlite3.connect(Path(CHROMA_DIR) / "chroma.sqlite3")) as conn:
+            conn.execute("VACUUM")
+        if deleted:
+            _commit()
+        else:
+            # Same content, just smaller files: no need to invalidate readers' caches
+            rag_vol.commit()
+
+        stats = {
+            "vectors_before": vectors_before,
+            "vectors_after": self._collection.count(),
+            "bytes_before": bytes_before,
+            "bytes_after": _dir_size(CHROMA_DIR),
+        }
+        print(f"  upsert-worker: compacted {stats}", flush=True)
+        return stats
+
+    @modal.method()
+    def export(self) -> dict:
+        """Write the collection as a memory-mapped vector index for the current generation."""
+        path = Path(GENERATION_PATH)
+        generation = int(path.read_text()) if path.exists() else 0
+        stats = export_collection(self._collection, generation)
+        rag_vol.commit()
+        index_state["exported"] = generation
+        print(f"  upsert-worker: exported {stats}", flush=True)
+        return stats
+
+    def _migrate_manifest(self) -> int:
+        versions: dict[str, dict[str, list[str]]] = {}
         total = self._collection.count()
         page_size = 5_000
         for offset in range(0, total, page_size):
             result = self._collection.get(include=["metadatas"], limit=page_size, offset=offset)
-            for meta in result["metadatas"] or []:
+            for chunk_id, meta in zip(result["ids"], result["metadatas"] or []):
                 source = meta.get("source")
                 fingerprint = meta.get("fingerprint")
                 if source and fingerprint:
-                    indexed[source] = fingerprint
-        return indexed
+                    versions.setdefault(source, {}).setdefault(fingerprint, []).append(chunk_id)
+
+        rows: dict[str, tuple[str, list[str]]] = {}
+        stale: list[str] = []
+        for source, by_fingerprint in versions.items():
+            # Fingerprints are mtime_ns:size — the largest mtime is the current version
+            latest = max(by_fingerprint, key=lambda fp: int(fp.split(":")[0]))
+            rows[source] = (latest, by_fingerprint.pop(latest))
+            stale.extend(i for ids in by_fingerprint.values() for i in ids)
+        self._manifest.rebuild(rows, stale)
+        rag_vol.commit()
+        print(
+            f"  upsert-worker: manifest built for {len(rows):,} files from {total:,} chunks "
+            f"({len(stale):,} stale)",
+            flush=True,
+        )
+        return len(rows)
+
+    def _write(self, chunks: ChunkBatch) -> None:
+        # Chroma takes the float32 matrix as-is — no per-float Python lists
+        embeddings = chunks.float32()
+        self._collection.upsert(
+            ids=chunks.ids,
+            embeddings=embeddings,
+            documents=chunks.texts,
+            metadatas=chunks.metadatas,
+        )
+        self._manifest.record(chunks.ids, chunks.metadatas)
+        self._cache.put_many(chunks.texts, embeddings)
+
+    def _delete_stale(self) -> int:
+        stale = self._manifest.stale_ids()
+        for i in range(0, len(stale), DELETE_BATCH):
+            batch = stale[i : i + DELETE_BATCH]
+            self._collection.delete(ids=batch)
+            self._manifest.clear_stale(batch)
+        return len(stale)
+
+
+def _commit() -> int:
+    """Bump the index generation, commit the volume, then publish the new generation."""
+    generation = _bump_generation()
+    rag_vol.commit()
+    # Only after the commit, so a reader that sees it finds the data on reload
+    index_state["generation"] = generation
+    return generation
+
+
+def _bump_generation() -> int:
+    path = Path(GENERATION_PATH)
+    generation = int(path.read_text()) + 1 if path.exists() else 1
+    path.write_text(str(generation))
+    return generation
+
+
+def _dir_size(path: str) -> int:
+    return sum(p.stat().st_size for p in Path(path).rglob("*") if p.is_file())
@@ -1,11 +1,19 @@
 """Orchestrates scan → parallel embed → upsert → summary."""
 
+from collections import Counter
 from pathlib import Path
 
+import modal
+
+from slackbot.modal_app import rag_vol
+from slackbot.rag.config import VECTOR_BACKEND
+
 from .pipeline.embed_worker import EmbedWorker, WORKERS_PER_GPU
-from .pipeline.upsert_worker import UpsertWorker
+from .pipeline.upsert_worker import Manifest, UpsertWorker
 from .pipeline.preprocess.batch_builder import BatchBuilder
+from .pipeline.preprocess.journal import Journal
 from .pipeline.preprocess.scanner import Scanner
+from .pipeline.stream import STOP
 
 # Number of GPU containers to fan out across
 N_WORKERS = 8
@@ -17,21 +25,94 @@ class IndexService:
     def __init__(self, docs_dir: Path = Path("/data/rag/docs")):
         self._embed_worker = EmbedWorker()
         self._upsert_worker = UpsertWorker()
-        self._scanner = Scanner(docs_dir, self._upsert_worker.get_indexed_files.remote)
+        self._manifest = Manifest()
+        self._journal = Journal()
+        self._scanner = Scanner(docs_dir, self._indexed_files, self._journal)
         self._batch_builder = BatchBuilder(N_WORKERS * WORKERS_PER_GPU)
 
-    def index(self) -> str:
-        """Run the full indexing pipeline. Blocks until complete."""
+    def index(self, stream: bool = True) -> str:
+        """Run the full indexing pipeline. Blocks until complete.
+
+        With stream=True, embed workers push sub-batches through a bounded
+        queue that the upsert worker drains concurrently, so ChromaDB writes
+        overlap GPU work. Otherwise each worker's full result is upserted
+        after it returns.
+        """
 
-        # Find new/changed files by comparing disk fingerprints to ChromaDB
-        files = self._scanner.scan()
+        # Find new/changed files by comparing disk fingerprints to the manifest
+        files, removed = self._scanner.scan()
+        if not files and not removed:
+            self._scanner.checkpoint()
+            return "Index is up to date."
 
         # Split files into per-worker batches (N_WORKERS × WORKERS_PER_GPU)
         batches = self._batch_builder.build(files)
 
-        # Embed on GPU, upsert to ChromaDB as each embed finishes
-        embeddings = self._embed_worker.embed.starmap(batches, order_outputs=False)
-        
-        chunks = sum(self._upsert_worker.upsert.remote(r) for r in embeddings)
+        stats = Counter()
+        if stream:
+            chunks = self._embed_and_upsert_streaming(batches, stats)
+        else:
+            chunks = self._embed_and_upsert(batches, stats)
+        print(
+            f"[index] stage busy across workers: parse {stats['parse_s']:.1f}s, "
+            f"chunk {stats['chunk_s']:.1f}s, embed {stats['embed_s']:.1f}s",
+            flush=True,
+        )
+
+        # Replace-on-reindex: drop superseded versions once the new chunks are committed
+        deleted = self._upsert_worker.finalize.remote(removed)
+        self._export()
+        self._scanner.checkpoint()
+
+        return (
+            f"Indexed {chunks:,} passages, removed {deleted:,} stale "
+            f"(embedding cache: {stats['cache_hits']:,} hits, {stats['cache_misses']:,} misses)."
+        )
+
+    def record_changes(self, paths: list[str]) -> None:
+        """Journal files written to the docs dir so the next scan only stats those."""
+        self._journal.append(paths)
+
+    def compact(self) -> str:
+        """Delete stale/orphaned vectors and reclaim ChromaDB disk space."""
+        stats = self._upsert_worker.compact.remote()
+        self._export()
+        reclaimed = stats["bytes_before"] - stats["bytes_after"]
+        return (
+            f"Compacted index: {stats['vectors_before'] - stats['vectors_after']:,} vectors removed "
+            f"({stats['vectors_after']:,} remain), {reclaimed / 1e6:,.1f} MB reclaimed "
+            f"({stats['bytes_before'] / 1e6:,.1f} MB → {stats['bytes_after'] / 1e6:,.1f} MB)."
+        )
+
+    def _export(self) -> None:
+        """Write the memory-mapped copy that RagService queries with VECTOR_BACKEND = "mmap"."""
+        if VECTOR_BACKEND == "mmap":
+            self._upsert_worker.export.remote()
+
+    def _embed_and_upsert(self, batches: list[tuple[dict, int]], stats: Counter) -> int:
+        """Embed on GPU, upsert to ChromaDB as each embed finishes."""
+        chunks = 0
+        for result, worker_id, worker_stats in self._embed_worker.embed.starmap(batches, order_outputs=False):
+            stats.update(worker_stats)
+            chunks += self._upsert_worker.upsert.remote(result, worker_id)
+        return chunks
+
+    def _embed_and_upsert_streaming(self, batches: list[tuple[dict, int]], stats: Counter) -> int:
+        """Overlap embedding and upserting through a backpressured queue."""
+        with modal.Queue.ephemeral() as queue:
+            consumer = self._upsert_worker.consume.spawn(queue)
+            try:
+                work = [(batch, worker_id, queue, consumer.object_id) for batch, worker_id in batches]
+                for worker_stats in self._embed_worker.embed_stream.starmap(work, order_outputs=False):
+                    stats.update(worker_stats)
+            finally:
+                # FIFO: STOP lands after every sub-batch the producers sent
+                queue.put(STOP)
+            return consumer.get()
 
-        return f"Indexed {chunks:,} passages."
+    def _indexed_files(self) -> dict[str, str]:
+        """Read fingerprints from the manifest, building it from ChromaDB on first use."""
+        if not self._manifest.exists():
+            self._upsert_worker.migrate_manifest.remote()
+            rag_vol.reload()
+        return self._manifest.fingerprints()
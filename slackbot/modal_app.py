@@ -12,4 +12,8 @@ data_vol = modal.Volume.from_name("sandbox-data", create_if_missing=True)
 rag_vol = modal.Volume.from_name("sandbox-rag", create_if_missing=True)
 trackio_vol = modal.Volume.from_name("sandbox-trackio", create_if_missing=True)
 
+# Index generation marker: UpsertWorker publishes after each rag_vol commit,
+# RagService polls it to know when to reload the volume
+index_state = modal.Dict.from_name("sandbox-rag-index", create_if_missing=True)
+
 TRACKIO_MOUNT = "/root/.cache/huggingface/trackio"
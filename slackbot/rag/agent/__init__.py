@@ -1,3 +1,6 @@
-from .run import parse_response, run_query
+from .interpreter import InterpreterPool
+from .profiler import QueryProfile
+from .run import parse_response, run_query, stream_query
+from .sessions import Sessions
 
-__all__ = ["run_query", "parse_response"]
+__all__ = ["run_query", "stream_query", "parse_response", "InterpreterPool", "QueryProfile", "Sessions"]
@@ -0,0 +1,115 @@
+"""Per-query latency breakdown built from the agent workflow's event stream.
+
+Records workflow build time, every LLM call (time to first token, total,
+prompt/completion tokens as reported by vLLM) and every tool call, plus
+the ReAct iteration count. Each finished profile is appended as one JSON
+line to PROFILE_LOG so p95 outliers can be traced to the step that cost
+the time.
+"""
+
+import json
+import os
+import time
+
+from ..config import AGENT_MAX_ITERATIONS, PROFILE_LOG
+
+
+class QueryProfile:
+    """Feed it workflow events with observe(); finish() returns the profile dict."""
+
+    def __init__(self, message: str):
+        # Created when the request arrives, so total_s includes cache lookup and queueing
+        self._start = time.perf_counter()
+        self._profile = {
+            "ts": time.time(),
+            "question": message[:200],
+            "queue_s": 0.0,
+            "build_s": 0.0,
+            "llm_calls": [],
+            "tool_calls": [],
+            "iterations": 0,
+            "max_iterations": AGENT_MAX_ITERATIONS,
+        }
+        self._agent_start = self._start
+        self._llm_call: dict | None = None
+        self._llm_started = 0.0
+        self._tools_started: dict[str, float] = {}
+
+    def agent_started(self) -> None:
+        """Mark the end of cache lookup and scheduler wait; workflow setup begins."""
+        self._agent_start = time.perf_counter()
+        self._profile["queue_s"] = self._elapsed(self._start, self._agent_start)
+
+    def built(self) -> None:
+        """Mark the workflow as constructed; the agent starts running now."""
+        self._profile["build_s"] = self._elapsed(self._agent_start)
+
+    def observe(self, ev) -> None:
+        from llama_index.core.agent.workflow import AgentInput, AgentOutput, AgentStream, ToolCall, ToolCallResult
+
+        now = time.perf_counter()
+        if isinstance(ev, AgentInput):
+            # One LLM call per ReAct iteration
+            self._profile["iterations"] += 1
+            self._llm_started = now
+            self._llm_call = {"ttft_s": None, "total_s": None, "prompt_tokens": None,
+                              "completion_tokens": None, "chunks": 0}
+        elif isinstance(ev, AgentStream) and self._llm_call is not None:
+            if self._llm_call["ttft_s"] is None:
+                self._llm_call["ttft_s"] = self._elapsed(self._llm_started, now)
+            self._llm_call["chunks"] += 1
+            usage = _usage(ev.raw)
+            if usage:
+                self._llm_call["prompt_tokens"] = usage.get("prompt_tokens")
+                self._llm_call["completion_tokens"] = usage.get("completion_tokens")
+        elif isinstance(ev, AgentOutput) and self._llm_call is not None:
+            self._llm_call["total_s"] = self._elapsed(self._llm_started, now)
+            self._profile["llm_calls"].append(self._llm_call)
+            self._llm_call = None
+        elif isinstance(ev, ToolCallResult):
+            started = self._tools_started.pop(ev.tool_id, now)
+            self._profile["tool_calls"].append({"tool": ev.tool_name, "duration_s": self._elapsed(started, now)})
+        elif isinstance(ev, ToolCall):
+            self._tools_started[ev.tool_id] = now
+
+    def finish(self, **extra) -> dict:
+        """Close the profile, append it to PROFILE_LOG and return it."""
+        profile = self._profile
+        if "total_s" in profile:
+            return profile
+        profile["total_s"] = self._elapsed(self._start)
+        profile["llm_s"] = round(sum(c["total_s"] or 0.0 for c in profile["llm_calls"]), 3)
+        profile["tool_s"] = round(sum(c["duration_s"] for c in profile["tool_calls"]), 3)
+        profile.update(extra)
+        _append(profile)
+        return profile
+
+    @staticmethod
+    def _elapsed(start: float, now: float | None = None) -> float:
+        return round((now or time.perf_counter()) - start, 3)
+
+
+# ── Helpers ───────────────────────────────────────────────────────────────────
+
+def _usage(raw) -> dict | None:
+    """Token usage from a raw OpenAI-style chunk (object or dict), if it carries any."""
+    usage = raw.get("usage") if isinstance(raw, dict) else getattr(raw, "usage", None)
+    if usage is None:
+        return None
+    return usage if isinstance(usage, dict) else {
+        "prompt_tokens": getattr(usage, "prompt_tokens", None),
+        "completion_tokens": getattr(usage, "completion_tokens", None),
+    }
+
+
+def _append(profile: dict) -> None:
+    """One write() per profile, so lines from concurrent queries never interleave."""
+    try:
+        PROFILE_LOG.parent.mkdir(parents=True, exist_ok=True)
+        fd = os.open(PROFILE_LOG, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, (json.dumps(profile) + "\n").encode())
+        finally:
+            os.close(fd)
+    except OSError as e:
+        print(f"[PROFILE] could not write {PROFILE_LOG}: {e}", flush=True)
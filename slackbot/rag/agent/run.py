@@ -1,23 +1,97 @@
 """Query execution and response parsing helpers."""
 
 import re
-import shutil
+from pathlib import Path
 
-from ..config import OUTPUT_DIR
-from .tools import list_output_files
+from .profiler import QueryProfile
+from .tools import new_output_dir, list_output_files
 
+# Status lines shown while the agent runs each tool
+_TOOL_STATUS = {
+    "search_documents": "Searching documents for “{query}”…",
+    "execute_python": "Running Python…",
+    "list_documents": "Listing documents…",
+}
 
-async def run_query(message, *, llm, search_index):
-    """Execute a RAG workflow and return the response."""
-    from .workflow import create_workflow
 
-    shutil.rmtree(OUTPUT_DIR, ignore_errors=True)
-    workflow = create_workflow(search_index, llm)
-    return await workflow.run(user_msg=message)
+async def run_query(message, *, llm, search_index, chat_history=None, profile: QueryProfile | None = None,
+                    interpreter=None):
+    """Execute a RAG workflow. Returns (text, output_files, profile dict).
+
+    output_files live in a directory of their own, which the caller removes
+    once they have been delivered.
+    """
+    profile = profile or QueryProfile(message)
+    handler, output_dir = _start(message, llm, search_index, chat_history, profile, interpreter)
+    async for ev in handler.stream_events():
+        profile.observe(ev)
+    text, output_files = parse_response(await handler, output_dir)
+    return text, output_files, profile.finish(outcome="answered", answer_chars=len(text))
+
+
+async def stream_query(message, *, llm, search_index, chat_history=None, profile: QueryProfile | None = None,
+                       interpreter=None):
+    """Run a RAG workflow, yielding progress events as they happen.
+
+    Yields ("status", text) when the agent calls a tool, ("token", delta)
+    for each piece of the final answer, then ("done", (text, output_files, profile)).
+    """
+    from llama_index.core.agent.workflow import AgentInput, AgentStream, ToolCall, ToolCallResult
 
+    profile = profile or QueryProfile(message)
+    handler, output_dir = _start(message, llm, search_index, chat_history, profile, interpreter)
+    answer = _AnswerTail()
+    async for ev in handler.stream_events():
+        profile.observe(ev)
+        if isinstance(ev, AgentStream):
+            if delta := answer.feed(ev.response):
+                yield "token", delta
+        elif isinstance(ev, ToolCall) and not isinstance(ev, ToolCallResult):
+            status = _TOOL_STATUS.get(ev.tool_name, f"Running {ev.tool_name}…")
+            yield "status", status.format(**{"query": "", **ev.tool_kwargs})
+        elif isinstance(ev, (AgentInput, ToolCallResult)):
+            # Next ReAct step — its reasoning text starts over
+            answer.reset()
+    text, output_files = parse_response(await handler, output_dir)
+    yield "done", (text, output_files, profile.finish(outcome="answered", answer_chars=len(text)))
 
-def parse_response(response) -> tuple[str, list[str]]:
-    """Strip think tags and collect output files."""
+
+def parse_response(response, output_dir: Path) -> tuple[str, list[str]]:
+    """Strip think tags and collect the request's output files."""
     text = re.sub(r"<think>.*?</think>", "", str(response), flags=re.DOTALL).strip()
-    output_files = list_output_files()
+    output_files = list_output_files(output_dir)
     return text, output_files
+
+
+# ── Helpers ───────────────────────────────────────────────────────────────────
+
+def _start(message, llm, search_index, chat_history, profile: QueryProfile, interpreter):
+    """Build the workflow in a fresh output dir and start it; returns (handler, output_dir)."""
+    from .workflow import create_workflow
+
+    profile.agent_started()
+    output_dir = new_output_dir()
+    workflow = create_workflow(search_index, llm, output_dir, interpreter)
+    profile.built()
+    return workflow.run(user_msg=message, chat_history=chat_history), output_dir
+
+
+class _AnswerTail:
+    """Pick the final answer out of a ReAct step's streamed Thought/Action/Answer text."""
+
+    _MARKER = "Answer:"
+
+    def __init__(self):
+        self._sent = 0
+
+    def reset(self) -> None:
+        self._sent = 0
+
+    def feed(self, response: str) -> str:
+        """Return answer text not yet emitted, given the step's response so far."""
+        i = response.find(self._MARKER)
+        if i < 0:
+            return ""
+        text = response[i + len(self._MARKER):].lstrip()
+        delta, self._sent = text[self._sent:], len(text)
+        return delta
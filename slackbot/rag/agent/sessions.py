@@ -0,0 +1,71 @@
+"""Per-thread conversation history for follow-up questions.
+
+Each Slack thread keeps its question/answer turns, replayed to the agent
+as chat history after the system prompt and tool descriptions. Only
+final answers are kept (no intermediate reasoning), and history is only
+ever appended to or cut back in large blocks, so consecutive turns of a
+thread share a long identical prompt prefix that vLLM's prefix cache
+serves without re-running prefill.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+from ..config import SESSION_MAX_TOKENS, SESSION_TTL, SESSIONS_MAX
+
+# Same rough estimate the index pipeline's TEI client uses
+_CHARS_PER_TOKEN = 4
+
+
+class Sessions:
+    """LRU of per-thread histories with idle expiry and a token cap."""
+
+    def __init__(self, max_sessions: int = SESSIONS_MAX, ttl: float = SESSION_TTL,
+                 max_tokens: int = SESSION_MAX_TOKENS):
+        self._max_sessions = max_sessions
+        self._ttl = ttl
+        self._max_tokens = max_tokens
+        # session_id -> (last_used, [(role, content), ...])
+        self._sessions: OrderedDict[str, tuple[float, list[tuple[str, str]]]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def history(self, session_id: str | None) -> list:
+        """Earlier turns of the session as ChatMessages, oldest first."""
+        from llama_index.core.llms import ChatMessage
+
+        if session_id is None:
+            return []
+        with self._lock:
+            self._expire()
+            _, turns = self._sessions.get(session_id, (0.0, []))
+            return [ChatMessage(role=role, content=content) for role, content in turns]
+
+    def record(self, session_id: str | None, question: str, answer: str) -> None:
+        """Append a finished turn, trimming old turns once past the token cap."""
+        if session_id is None or not answer:
+            return
+        with self._lock:
+            _, turns = self._sessions.pop(session_id, (0.0, []))
+            turns = turns + [("user", question), ("assistant", answer)]
+            if _tokens(turns) > self._max_tokens:
+                # Cut to half the cap in one go: the kept turns then stay an
+                # unchanged prefix for several more turns instead of shifting every time
+                while turns and _tokens(turns) > self._max_tokens // 2:
+                    turns = turns[2:]
+            self._sessions[session_id] = (time.monotonic(), turns)
+            while len(self._sessions) > self._max_sessions:
+                self._sessions.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def _expire(self) -> None:
+        cutoff = time.monotonic() - self._ttl
+        # Least recently used first, so stop at the first live session
+        while self._sessions and next(iter(self._sessions.values()))[0] < cutoff:
+            self._sessions.popitem(last=False)
+
+
+def _tokens(turns: list[tuple[str, str]]) -> int:
+    return sum(len(content) for _, content in turns) // _CHARS_PER_TOKEN
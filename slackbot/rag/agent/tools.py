@@ -1,42 +1,53 @@
 """Stateless tool functions for the ReAct agent."""
 
+import shutil
 import subprocess
 import sys
+import time
+import uuid
+from pathlib import Path
 
-from ..config import DOCS_DIR, OUTPUT_DIR, TOP_K
+from ..config import DOCS_DIR, OUTPUT_DIR, OUTPUT_TTL, TOP_K
 
 
 def search_documents(query: str, search_index) -> str:
     """Search indexed documents for relevant chunks."""
     if not search_index.has_index():
         return "No documents indexed yet. Ask the user to upload files and run reindex."
-    retriever = search_index.index.as_retriever(similarity_top_k=TOP_K)
-    nodes = retriever.retrieve(query)
-    print(f"[SEARCH] {query!r} -> {len(nodes)} chunks", file=sys.stderr, flush=True)
+    nodes = search_index.search(query, top_k=TOP_K)
+    hit_rate = search_index.cache_stats()["results"]["hit_rate"]
+    print(f"[SEARCH] {query!r} -> {len(nodes)} chunks (result cache hit rate {hit_rate:.0%})",
+          file=sys.stderr, flush=True)
     if not nodes:
         return "No relevant documents found for this query."
     chunks = [f"[Source: {n.metadata.get('source', 'unknown')}]\n{n.get_content()}" for n in nodes]
     return "\n\n---\n\n".join(chunks)
 
 
-def execute_python(code: str) -> str:
+def execute_python(code: str, output_dir: Path, interpreter=None) -> str:
     """Execute Python code for data analysis.
 
     Pre-installed: pandas, matplotlib, openpyxl, pypdf, python-docx.
-    Save output files to /data/rag/output/.
+    Runs with the request's output_dir as working directory; files saved
+    there are returned with the answer.
     Input documents are at /data/rag/docs/.
+    Runs in a forked warm interpreter when given an InterpreterPool,
+    otherwise in a fresh `python -c` subprocess.
     """
     code = code.replace("\\n", "\n").replace("\\t", "\t")
     print(f"[EXECUTE_PYTHON] code:\n{code}", file=sys.stderr, flush=True)
-    OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+    output_dir.mkdir(parents=True, exist_ok=True)
     try:
-        result = subprocess.run(
-            ["python", "-c", code],
-            capture_output=True,
-            text=True,
-            timeout=120,
-            cwd=str(OUTPUT_DIR.parent),
-        )
+        if interpreter is not None:
+            result = interpreter.run(code, cwd=str(output_dir), timeout=120)
+        else:
+            result = subprocess.run(
+                ["python", "-c", code],
+                capture_output=True,
+                text=True,
+                timeout=120,
+                cwd=str(output_dir),
+            )
     except subprocess.TimeoutExpired:
         return "[Error: Code execution timed out after 120 seconds]"
     output = _format_result(result)
@@ -56,11 +67,20 @@ def list_documents() -> str:
     return "\n".join(paths) if paths else "No files found in /data/rag/docs/"
 
 
-def list_output_files() -> list[str]:
-    """Return paths of files in the output directory."""
-    if not OUTPUT_DIR.exists():
+def new_output_dir() -> Path:
+    """Pick a fresh OUTPUT_DIR/<request id>/ for one query, sweeping abandoned ones.
+
+    Created by execute_python on first use, so queries without files leave nothing behind.
+    """
+    _sweep_output_dirs()
+    return OUTPUT_DIR / uuid.uuid4().hex
+
+
+def list_output_files(output_dir: Path) -> list[str]:
+    """Return paths of files in a request's output directory."""
+    if not output_dir.exists():
         return []
-    return [str(p) for p in sorted(OUTPUT_DIR.iterdir()) if p.is_file()]
+    return [str(p) for p in sorted(output_dir.iterdir()) if p.is_file()]
 
 
 # ── Helpers ───────────────────────────────────────────────────────────────────
@@ -74,3 +94,20 @@ def _format_result(result: subprocess.CompletedProcess) -> str:
     if result.returncode != 0:
         parts.append(f"[Exit code: {result.returncode}]")
     return "\n".join(parts).strip() or "[No output]"
+
+
+def _sweep_output_dirs() -> None:
+    """Remove request dirs (and stray files) older than OUTPUT_TTL that were never cleaned up."""
+    if not OUTPUT_DIR.exists():
+        return
+    cutoff = time.time() - OUTPUT_TTL
+    for p in OUTPUT_DIR.iterdir():
+        try:
+            if p.stat().st_mtime >= cutoff:
+                continue
+            if p.is_dir():
+                shutil.rmtree(p, ignore_errors=True)
+            else:
+                p.unlink()
+        except OSError:
+            pass  # Removed concurrently
@@ -2,24 +2,33 @@
 
 from __future__ import annotations
 
+from pathlib import Path
 from typing import TYPE_CHECKING
 
 from llama_index.core.agent.workflow import AgentWorkflow, ReActAgent
 from llama_index.core.tools import FunctionTool
 
-from ..config import SYSTEM_PROMPT
+from ..config import AGENT_MAX_ITERATIONS, SYSTEM_PROMPT
 from ..llm import LLM
 from .tools import execute_python, list_documents, search_documents
 
 if TYPE_CHECKING:
     from ..db import SearchIndex
+    from .interpreter import InterpreterPool
 
 
-def create_workflow(search_index: SearchIndex, llm: LLM) -> AgentWorkflow:
-    """Create a ReAct agent with search, code execution, and file listing tools."""
+def create_workflow(search_index: SearchIndex, llm: LLM, output_dir: Path,
+                    interpreter: InterpreterPool | None = None) -> AgentWorkflow:
+    """Create a ReAct agent with search, code execution, and file listing tools.
+
+    execute_python runs in output_dir, so each query's files stay separate.
+    """
     def _search(query: str) -> str:
         return search_documents(query, search_index)
 
+    def _execute(code: str) -> str:
+        return execute_python(code, output_dir, interpreter)
+
     tools = [
         FunctionTool.from_defaults(
             fn=_search,
@@ -27,10 +36,10 @@ def create_workflow(search_index: SearchIndex, llm: LLM) -> AgentWorkflow:
             description="Search indexed documents for relevant information.",
         ),
         FunctionTool.from_defaults(
-            fn=execute_python,
+            fn=_execute,
             name="execute_python",
             description="Execute Python code in a subprocess. "
-            "Working directory is /data/rag/. "
+            "Working directory is this request's output directory; files saved there are sent to the user. "
             "Pre-installed: pandas, matplotlib, openpyxl, pypdf, python-docx.",
         ),
         FunctionTool.from_defaults(
@@ -43,7 +52,7 @@ def create_workflow(search_index: SearchIndex, llm: LLM) -> AgentWorkflow:
         tools=tools,
         llm=llm.model,
         system_prompt=SYSTEM_PROMPT,
-        max_iterations=10,
+        max_iterations=AGENT_MAX_ITERATIONS,
         verbose=True,
     )
     return AgentWorkflow(agents=[agent])
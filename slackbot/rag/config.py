@@ -6,21 +6,72 @@ from pathlib import Path
 RAG_ROOT = Path("/data/rag")
 DOCS_DIR = RAG_ROOT / "docs"
 CHROMA_DIR = RAG_ROOT / "chroma"
+# Each query writes to its own OUTPUT_DIR/<request id>/, removed after upload
 OUTPUT_DIR = RAG_ROOT / "output"
+# Request output dirs older than this (failed uploads, timeouts) are swept
+OUTPUT_TTL = 60 * 60
+# Output files up to this size are returned inline as bytes; larger ones by volume path
+INLINE_FILE_MAX_BYTES = 4 * 1024 * 1024
+# One JSON line per query: build time, LLM calls, tool calls, iterations
+PROFILE_LOG = RAG_ROOT / "profiles.jsonl"
+ANSWER_CACHE_DIR = RAG_ROOT / "answer_cache"
+VECTORS_DIR = RAG_ROOT / "vectors"
+# Written by the index pipeline's UpsertWorker; advances on every content change
+INDEX_GENERATION_PATH = RAG_ROOT / "index_generation"
 
 # --- LLM (vLLM subprocess) ---
 VLLM_MODEL = "Qwen/Qwen3-14B-AWQ"  # AWQ 4-bit, ~8GB on A10G
 LLM_CONTEXT_WINDOW = 16384
+# Queries beyond the running ones (VLLM_MAX_NUM_SEQS) that may wait; more get a busy reply
+RAG_MAX_QUEUED = 8
+# Seconds a query may spend queued plus running
+RAG_REQUEST_DEADLINE = 180.0
+BUSY_REPLY = "I'm handling too many questions right now. Please try again in a minute."
+TIMEOUT_REPLY = "Sorry, that took too long to answer. Please try again or narrow the question."
+
+# --- Sessions (per Slack thread) ---
+SESSIONS_MAX = 256
+# Seconds of inactivity before a thread's history is dropped
+SESSION_TTL = 60 * 60
+# History kept per thread, leaving the rest of LLM_CONTEXT_WINDOW for tools and the answer
+SESSION_MAX_TOKENS = 6_000
 
 # --- Embeddings ---
 EMBEDDING_MODEL = "BAAI/bge-base-en-v1.5"  # 110M params, 768-dim
+# "cuda": fp32 on the A10G next to vLLM; "cpu-int8": dynamically quantized on CPU
+QUERY_ENCODER = "cuda"
+# Below this cosine vs the index's GPU vectors, the CPU encoder is flagged on load
+QUERY_ENCODER_MIN_COSINE = 0.97
+# With the query encoder off the GPU, vLLM's KV cache fits more concurrent sequences
+VLLM_MAX_NUM_SEQS = 8 if QUERY_ENCODER == "cpu-int8" else 4
+
+# --- Agent ---
+AGENT_MAX_ITERATIONS = 10
 
 # --- Retrieval ---
 TOP_K = 3
+# Cached query embeddings / top-k result lists per SearchIndex
+QUERY_CACHE_SIZE = 1024
+
+# --- Answer cache ---
+# Cosine similarity (bge, normalized) above which a past answer is reused
+ANSWER_CACHE_THRESHOLD = 0.95
+ANSWER_CACHE_SIZE = 512
 
 # --- ChromaDB ---
 CHROMA_COLLECTION = "rag_documents"
 
+# --- Query-path vector backend ---
+# "chroma" queries the collection; "mmap" scans the pipeline's memory-mapped
+# export and falls back to Chroma until one exists for the current generation
+VECTOR_BACKEND = "chroma"
+# IVF lists scanned per query when the export is partitioned
+IVF_NPROBE = 16
+# Minimum seconds between polls of the pipeline's index generation marker
+INDEX_CHECK_INTERVAL = 2.0
+# After a failed volume reload, keep serving the current view this many seconds before retrying
+INDEX_RELOAD_RETRY = 30.0
+
 # --- System prompt ---
 SYSTEM_PROMPT = (
     "/no_think\n"
@@ -31,7 +82,7 @@ SYSTEM_PROMPT = (
     "Use for questions about document content, concepts, or facts.\n\n"
     "**execute_python(code)** — runs Python in a subprocess and returns stdout. "
     "Use for data analysis, file reading, chart generation, or any computation. "
-    "Save charts/outputs to /data/rag/output/. "
+    "Save charts/outputs to the working directory with relative paths, e.g. plt.savefig('chart.png'). "
     "Pre-installed: pandas, matplotlib, openpyxl, pypdf, python-docx.\n\n"
     "Rules:\n"
     "- When the user mentions a file: call list_documents first, then execute_python with the exact path.\n"
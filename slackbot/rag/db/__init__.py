@@ -1,3 +1,14 @@
-from .search import SearchIndex
+from .answer_cache import AnswerCache
+from .vector_index import VectorIndex
 
-__all__ = ["SearchIndex"]
+__all__ = ["AnswerCache", "SearchIndex", "VectorIndex"]
+
+
+def __getattr__(name: str):
+    # search.py pulls in chromadb and LlamaIndex; import it only when asked for, so
+    # VectorIndex and the bench work without them
+    if name == "SearchIndex":
+        from .search import SearchIndex
+
+        return SearchIndex
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,132 @@
+"""Semantic answer cache — reuse final answers for paraphrased questions.
+
+Each entry is a directory under ANSWER_CACHE_DIR holding answer.json
+(question, embedding, index generation, text) and copies of the answer's
+output files, so entries survive container scale-down and the removal
+of the request's own output directory.
+"""
+
+import json
+import shutil
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
+
+from ..config import ANSWER_CACHE_DIR, ANSWER_CACHE_SIZE, ANSWER_CACHE_THRESHOLD
+
+
+class AnswerCache:
+    """In-memory similarity lookup over entries persisted on the rag volume.
+
+    Only entries from the current index generation match; older ones are
+    deleted as soon as a newer generation is seen. Least recently used
+    entries are evicted past max_entries.
+    """
+
+    def __init__(self, root: Path = ANSWER_CACHE_DIR, threshold: float = ANSWER_CACHE_THRESHOLD,
+                 max_entries: int = ANSWER_CACHE_SIZE):
+        self._root = root
+        self._threshold = threshold
+        self._max_entries = max_entries
+        self._entries: OrderedDict[str, dict] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def load(self) -> None:
+        """Read entries written by this or other containers, oldest first."""
+        entries = []
+        for path in self._root.glob("*/answer.json"):
+            try:
+                entry = json.loads(path.read_text())
+            except (OSError, ValueError):
+                continue
+            entry["embedding"] = np.asarray(entry["embedding"], dtype=np.float32)
+            entries.append((path.parent.name, entry))
+        with self._lock:
+            self._entries = OrderedDict(sorted(entries, key=lambda e: e[1]["used_at"]))
+        print(f"[ANSWER_CACHE] loaded {len(entries)} entries", flush=True)
+
+    def lookup(self, embedding: list[float], generation: int) -> tuple[str, list[str]] | None:
+        """Return (text, output_files) of the closest cached answer above threshold."""
+        query = np.asarray(embedding, dtype=np.float32)
+        with self._lock:
+            self._expire(generation)
+            best_id, best_score = None, self._threshold
+            for entry_id, entry in self._entries.items():
+                if entry["generation"] != generation:
+                    continue
+                # Embeddings are normalized, so the dot product is cosine similarity
+                score = float(entry["embedding"] @ query)
+                if score >= best_score:
+                    best_id, best_score = entry_id, score
+            if best_id is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(best_id)
+            entry = self._entries[best_id]
+            entry["used_at"] = time.time()
+        # Persist the access time so LRU order survives reloads in other containers
+        self._write(best_id, entry)
+        print(f"[ANSWER_CACHE] hit {entry['question']!r} (similarity {best_score:.3f})", flush=True)
+        return entry["text"], [str(self._root / best_id / name) for name in entry["files"]]
+
+    def store(self, question: str, embedding: list[float], generation: int,
+              text: str, output_files: list[str]) -> list[str]:
+        """Persist an answer with copies of its output files; returns the copies' paths."""
+        entry_id = uuid.uuid4().hex
+        entry_dir = self._root / entry_id
+        entry_dir.mkdir(parents=True, exist_ok=True)
+        files = []
+        for f in map(Path, output_files):
+            if f.is_file():
+                shutil.copy2(f, entry_dir / f.name)
+                files.append(f.name)
+        entry = {
+            "question": question,
+            "embedding": np.asarray(embedding, dtype=np.float32),
+            "generation": generation,
+            "text": text,
+            "files": files,
+            "used_at": time.time(),
+        }
+        self._write(entry_id, entry)
+        with self._lock:
+            self._entries[entry_id] = entry
+            while len(self._entries) > self._max_entries:
+                self._drop(next(iter(self._entries)))
+        return [str(entry_dir / name) for name in files]
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+    def _expire(self, generation: int) -> None:
+        """Drop entries from older index generations (caller holds the lock)."""
+        for entry_id in [i for i, e in self._entries.items() if e["generation"] < generation]:
+            self._drop(entry_id)
+
+    def _write(self, entry_id: str, entry: dict) -> None:
+        """Write answer.json via a temp file, so other containers never read it half-written."""
+        path = self._root / entry_id / "answer.json"
+        tmp = path.with_suffix(".tmp")
+        try:
+            tmp.write_text(json.dumps({**entry, "embedding": entry["embedding"].tolist()}))
+            tmp.replace(path)
+        except OSError as e:
+            # Entry dropped meanwhile (e.g. expired by a concurrent lookup)
+            print(f"[ANSWER_CACHE] could not write {entry_id}: {e}", flush=True)
+
+    def _drop(self, entry_id: str) -> None:
+        self._entries.pop(entry_id, None)
+        shutil.rmtree(self._root / entry_id, ignore_errors=True)
@@ -0,0 +1,140 @@
+"""Benchmark the memory-mapped flat/IVF index against ChromaDB.
+
+Builds a synthetic clustered corpus of normalized 768-d vectors at each
+size, exports it with the index pipeline's exporter, loads the same
+vectors into a throwaway ChromaDB collection, and reports recall@k
+against exact search plus p50/p99 query latency (including the chunk
+text/metadata lookup, which Chroma's query also returns):
+
+    python -m slackbot.rag.db.bench
+    python -m slackbot.rag.db.bench --sizes 10000 100000 --backends flat ivf
+"""
+
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from slackbot.index_pipeline.pipeline.upsert_worker.exporter import export_collection
+
+from .vector_index import VectorIndex
+
+DIM = 768
+CLUSTERS = 1_000
+CHROMA_BATCH = 5_000
+
+
+class _ArrayCollection:
+    """Just enough of a Chroma collection for export_collection()."""
+
+    def __init__(self, vectors):
+        self._vectors = vectors
+
+    def count(self) -> int:
+        return len(self._vectors)
+
+    def get(self, include, limit, offset) -> dict:
+        rows = range(offset, min(offset + limit, len(self._vectors)))
+        return {
+            "ids": [f"chunk-{i}" for i in rows],
+            "embeddings": self._vectors[offset : offset + limit],
+            "documents": [f"text of chunk {i}" for i in rows],
+            "metadatas": [{"source": f"doc-{i // 50}.pdf"} for i in rows],
+        }
+
+
+def _corpus(n: int, queries: int, seed: int = 0):
+    """Gaussian clusters around random centres — topical documents — plus nearby queries."""
+    rng = np.random.default_rng(seed)
+    centres = rng.standard_normal((CLUSTERS, DIM)).astype(np.float32)
+    vectors = np.empty((n, DIM), dtype=np.float32)
+    for i in range(0, n, 100_000):
+        m = min(100_000, n - i)
+        vectors[i : i + m] = centres[rng.integers(CLUSTERS, size=m)]
+        vectors[i : i + m] += 0.8 * rng.standard_normal((m, DIM), dtype=np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    picks = rng.integers(n, size=queries)
+    q = vectors[picks] + 0.5 * rng.standard_normal((queries, DIM), dtype=np.float32) / np.sqrt(DIM)
+    return vectors, q / np.linalg.norm(q, axis=1, keepdims=True)
+
+
+def _exact(vectors, queries, k: int) -> list[set[int]]:
+    truth = []
+    for q in queries:
+        scores = vectors @ q
+        truth.append(set(np.argpartition(-scores, k)[:k].tolist()))
+    return truth
+
+
+def _time(search, queries, truth, k: int) -> tuple[float, float, float]:
+    latencies, found = [], 0
+    for q, expected in zip(queries, truth):
+        start = time.perf_counter()
+        ids = search(q)
+        latencies.append(time.perf_counter() - start)
+        found += len(expected & ids)
+    p50, p99 = np.percentile(latencies, [50, 99]) * 1e3
+    return found / (k * len(queries)), p50, p99
+
+
+def _mmap_search(index: VectorIndex, k: int):
+    def search(q):
+        hits = index.search(q, k)
+        chunks = index.chunks([row for row, _ in hits])
+        return {int(chunk_id.rsplit("-", 1)[1]) for chunk_id, _, _ in chunks}
+    return search
+
+
+def _chroma_search(vectors, tmp: Path, k: int):
+    import chromadb
+
+    client = chromadb.PersistentClient(path=str(tmp / "chroma"))
+    collection = client.create_collection("bench", metadata={"hnsw:space": "cosine"})
+    source = _ArrayCollection(vectors)
+    for offset in range(0, len(vectors), CHROMA_BATCH):
+        page = source.get(None, CHROMA_BATCH, offset)
+        collection.add(ids=page["ids"], embeddings=page["embeddings"],
+                       documents=page["documents"], metadatas=page["metadatas"])
+
+    def search(q):
+        result = collection.query(query_embeddings=[q.tolist()], n_results=k)
+        return {int(i.rsplit("-", 1)[1]) for i in result["ids"][0]}
+    return search
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--backends", nargs="+", default=["chroma", "flat", "ivf"],
+                        choices=["chroma", "flat", "ivf"])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=3)
+    parser.add_argument("--nprobe", type=int, default=16)
+    args = parser.parse_args()
+
+    print(f"{'chunks':>10}  {'backend':<12} {'recall@' + str(args.top_k):>9}  {'p50 ms':>8}  {'p99 ms':>8}  build s")
+    for n in args.sizes:
+        vectors, queries = _corpus(n, args.queries)
+        truth = _exact(vectors, queries, args.top_k)
+        with tempfile.TemporaryDirectory() as tmp:
+            tmp = Path(tmp)
+            for backend in args.backends:
+                start = time.perf_counter()
+                if backend == "chroma":
+                    search = _chroma_search(vectors, tmp, args.top_k)
+                    label = "chroma hnsw"
+                else:
+                    ivf = backend == "ivf"
+                    stats = export_collection(_ArrayCollection(vectors), 1, root=str(tmp / backend), ivf=ivf)
+                    index = VectorIndex(Path(stats["path"]), nprobe=args.nprobe)
+                    search = _mmap_search(index, args.top_k)
+                    label = f"ivf {stats['lists']}/{args.nprobe}" if ivf else "mmap flat"
+                build_s = time.perf_counter() - start
+                recall, p50, p99 = _time(search, queries, truth, args.top_k)
+                print(f"{n:>10,}  {label:<12} {recall:>9.3f}  {p50:>8.2f}  {p99:>8.2f}  {build_s:7.1f}", flush=True)
+
+
+if __name__ == "__main__":
+    main()
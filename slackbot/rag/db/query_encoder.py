@@ -0,0 +1,148 @@
+"""Query encoders for SearchIndex — bge-base on the GPU, or int8 on the CPU.
+
+QUERY_ENCODER = "cpu-int8" keeps the embedding model off the A10G so vLLM
+gets the memory: bge's Linear layers are dynamically quantized to int8
+(the same scheme as ONNX Runtime's dynamic quantization, without an
+export step). validate() re-embeds indexed chunks and checks the result
+against the GPU-produced vectors stored alongside them.
+
+Check agreement with fp32 and single-query CPU latency, optionally against
+the TEI-produced (GPU) vectors in a ChromaDB directory:
+    python -m slackbot.rag.db.query_encoder [--chroma /data/rag/chroma]
+"""
+
+import argparse
+import time
+
+from ..config import CHROMA_COLLECTION, EMBEDDING_MODEL, QUERY_ENCODER
+
+# Chunks re-embedded on load to check the CPU encoder against the index
+VALIDATION_SAMPLE = 64
+
+_QUERIES = [
+    "what is the PTO policy",
+    "how many vacation days do new employees get",
+    "who approves expense reports over $500",
+    "summarize the Q3 revenue numbers",
+    "what does the contract say about termination notice",
+    "list the action items from the last board meeting",
+    "how do I request access to the VPN",
+    "which products were discontinued in 2023",
+    "what is the parental leave policy",
+    "explain the onboarding checklist for engineers",
+    "what are the security requirements for laptops",
+    "when is the next performance review cycle",
+]
+
+
+def create_embed_model(mode: str = QUERY_ENCODER):
+    """HuggingFaceEmbedding for bge-base on "cuda", or int8-quantized on "cpu-int8"."""
+    from llama_index.embeddings.huggingface import HuggingFaceEmbedding
+
+    if mode == "cuda":
+        return HuggingFaceEmbedding(model_name=EMBEDDING_MODEL, device="cuda", normalize=True, embed_batch_size=256)
+    if mode in ("cpu", "cpu-int8"):
+        embed = HuggingFaceEmbedding(model_name=EMBEDDING_MODEL, device="cpu", normalize=True, embed_batch_size=32)
+        if mode == "cpu-int8":
+            quantize(embed)
+        return embed
+    raise ValueError(f"Unknown QUERY_ENCODER {mode!r} (expected 'cuda', 'cpu' or 'cpu-int8')")
+
+
+def quantize(embed) -> None:
+    """Swap the SentenceTransformer's Linear layers for dynamic int8 ones, in place."""
+    import torch
+
+    embed._model = torch.ao.quantization.quantize_dynamic(embed._model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def validate(embed, collection, sample: int = VALIDATION_SAMPLE) -> dict:
+    """Re-embed stored chunks and compare with the GPU-produced vectors in the collection.
+
+    Returns {"n", "min_cosine", "mean_cosine"}; n=0 for an empty index.
+    """
+    import numpy as np
+
+    page = collection.get(include=["embeddings", "documents"], limit=sample)
+    if not page["ids"]:
+        return {"n": 0, "min_cosine": 1.0, "mean_cosine": 1.0}
+    stored = _normalized(np.asarray(page["embeddings"], dtype=np.float32))
+    fresh = _normalized(np.asarray(embed.get_text_embedding_batch(page["documents"]), dtype=np.float32))
+    cosines = (stored * fresh).sum(axis=1)
+    return {"n": len(cosines), "min_cosine": float(cosines.min()), "mean_cosine": float(cosines.mean())}
+
+
+# ── Helpers ───────────────────────────────────────────────────────────────────
+
+def _normalized(matrix):
+    import numpy as np
+
+    return matrix / np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12)
+
+
+def _latency(embed, queries: list[str], runs: int) -> tuple[float, float]:
+    import numpy as np
+
+    embed.get_query_embedding(queries[0])
+    times = []
+    for i in range(runs):
+        start = time.perf_counter()
+        embed.get_query_embedding(queries[i % len(queries)])
+        times.append(time.perf_counter() - start)
+    p50, p99 = np.percentile(times, [50, 99]) * 1e3
+    return p50, p99
+
+
+def _recall(reference, candidate, passages, k: int) -> float:
+    """Overlap of top-k passages retrieved with candidate vs reference query vectors."""
+    import numpy as np
+
+    found = 0
+    for ref, cand in zip(reference, candidate):
+        top_ref = set(np.argsort(-(passages @ ref))[:k].tolist())
+        top_cand = set(np.argsort(-(passages @ cand))[:k].tolist())
+        found += len(top_ref & top_cand)
+    return found / (k * len(reference))
+
+
+def main() -> None:
+    import numpy as np
+    import torch
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chroma", help="ChromaDB dir to validate against and retrieve from")
+    parser.add_argument("--runs", type=int, default=200)
+    parser.add_argument("--threads", type=int, default=torch.get_num_threads())
+    parser.add_argument("--top-k", type=int, default=3)
+    args = parser.parse_args()
+    torch.set_num_threads(args.threads)
+
+    fp32 = create_embed_model("cpu")
+    int8 = create_embed_model("cpu-int8")
+    queries = _QUERIES
+    ref = _normalized(np.asarray([fp32.get_query_embedding(q) for q in queries], dtype=np.float32))
+    q8 = _normalized(np.asarray([int8.get_query_embedding(q) for q in queries], dtype=np.float32))
+    cosines = (ref * q8).sum(axis=1)
+    print(f"query vectors int8 vs fp32: min cosine {cosines.min():.4f}, mean {cosines.mean():.4f}")
+
+    if args.chroma:
+        import chromadb
+
+        collection = chromadb.PersistentClient(path=args.chroma).get_collection(CHROMA_COLLECTION)
+        for name, embed in [("fp32", fp32), ("int8", int8)]:
+            check = validate(embed, collection)
+            print(f"{name} cpu vs stored GPU vectors ({check['n']} chunks): "
+                  f"min cosine {check['min_cosine']:.4f}, mean {check['mean_cosine']:.4f}")
+        page = collection.get(include=["embeddings"], limit=20_000)
+        passages = _normalized(np.asarray(page["embeddings"], dtype=np.float32))
+        print(f"recall@{args.top_k} of int8 vs fp32 queries over {len(passages):,} chunks: "
+              f"{_recall(ref, q8, passages, args.top_k):.3f}")
+
+    print(f"single-query CPU latency, {args.threads} threads, {args.runs} runs:")
+    for name, embed in [("fp32", fp32), ("int8", int8)]:
+        p50, p99 = _latency(embed, queries, args.runs)
+        print(f"  {name}: p50 {p50:6.1f} ms  p99 {p99:6.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,45 +1,203 @@
 """Read-only vector index for query-time search."""
 
+import sys
+import threading
+import time
+
 import chromadb
+from chromadb.api.client import SharedSystemClient
 from llama_index.core import StorageContext, VectorStoreIndex
-from llama_index.embeddings.huggingface import HuggingFaceEmbedding
+from llama_index.core.schema import NodeWithScore, QueryBundle, TextNode
 from llama_index.vector_stores.chroma import ChromaVectorStore
 
-from ..config import CHROMA_COLLECTION, CHROMA_DIR, EMBEDDING_MODEL
+from slackbot.modal_app import index_state, rag_vol
+
+from ..config import (
+    CHROMA_COLLECTION, CHROMA_DIR, INDEX_CHECK_INTERVAL, INDEX_GENERATION_PATH, INDEX_RELOAD_RETRY,
+    QUERY_CACHE_SIZE, QUERY_ENCODER, QUERY_ENCODER_MIN_COSINE, TOP_K, VECTOR_BACKEND,
+)
+from .cache import LRUCache
+from .query_encoder import create_embed_model, validate
+from .vector_index import VectorIndex
 
 
 class SearchIndex:
     """Holds the embedding model and VectorStoreIndex for query-time search.
 
     The index_pipeline handles writing to ChromaDB — this class only reads.
+    With VECTOR_BACKEND = "mmap" it searches the pipeline's memory-mapped
+    export instead, and only opens ChromaDB while no export exists.
+    Query embeddings and top-k results are LRU-cached by normalized query
+    text; results are also keyed by the index generation the pipeline
+    last wrote, and are dropped whenever the collection is reloaded.
+
+    refresh() polls the pipeline's shared generation marker and reloads
+    the volume only when it has moved, so warm containers see new
+    documents without reconnecting on every query.
     """
 
     def __init__(self):
-        self.embed_model = HuggingFaceEmbedding(
-            model_name=EMBEDDING_MODEL,
-            device="cuda",
-            normalize=True,
-            embed_batch_size=256,
-        )
+        self.embed_model = create_embed_model(QUERY_ENCODER)
+        self.encoder_check: dict | None = None
+        self._embeddings = LRUCache(QUERY_CACHE_SIZE)
+        self._results = LRUCache(QUERY_CACHE_SIZE)
+        # Held for retrievals too, so a refresh never closes the store mid-search
+        self._lock = threading.RLock()
+        self._checked_at = 0.0
+        self._retry_at = 0.0
         self._load_collection()
 
     def _load_collection(self):
-        """Open ChromaDB and build the LlamaIndex vector store."""
-        CHROMA_DIR.mkdir(parents=True, exist_ok=True)
-        client = chromadb.PersistentClient(path=str(CHROMA_DIR))
-        self._collection = client.get_or_create_collection(CHROMA_COLLECTION)
-        vector_store = ChromaVectorStore(chroma_collection=self._collection)
-        storage_context = StorageContext.from_defaults(vector_store=vector_store)
-        self.index = VectorStoreIndex.from_vector_store(
-            vector_store,
-            embed_model=self.embed_model,
-            storage_context=storage_context,
-        )
+        """Open the mmap export or ChromaDB and build the LlamaIndex vector store."""
+        generation = _read_generation()
+        vectors = VectorIndex.open(generation) if VECTOR_BACKEND == "mmap" else None
+        if vectors is None:
+            CHROMA_DIR.mkdir(parents=True, exist_ok=True)
+            client = chromadb.PersistentClient(path=str(CHROMA_DIR))
+        with self._lock:
+            self._vectors = vectors
+            if vectors is None:
+                self._collection = client.get_or_create_collection(CHROMA_COLLECTION)
+                vector_store = ChromaVectorStore(chroma_collection=self._collection)
+                storage_context = StorageContext.from_defaults(vector_store=vector_store)
+                self.index = VectorStoreIndex.from_vector_store(
+                    vector_store,
+                    embed_model=self.embed_model,
+                    storage_context=storage_context,
+                )
+            self._retrievers = {}
+            # Embeddings depend only on the model; results die with the generation
+            self.generation = generation
+            self._results.clear()
+        if vectors is None and QUERY_ENCODER != "cuda" and self.encoder_check is None:
+            self._check_encoder()
 
     def reload(self):
         """Reconnect to ChromaDB to pick up changes from the index pipeline."""
         self._load_collection()
 
+    def refresh(self) -> bool:
+        """Reload the volume and reopen the index if a newer generation was published.
+
+        Costs one modal.Dict read, at most every INDEX_CHECK_INTERVAL
+        seconds. If the volume reload fails, the current view is reopened
+        and no further attempt is made for INDEX_RELOAD_RETRY seconds.
+        Returns True if a newer view of the index was opened.
+        """
+        now = time.monotonic()
+        if now - self._checked_at < INDEX_CHECK_INTERVAL or now < self._retry_at:
+            return False
+        self._checked_at = now
+        stale = index_state.get("generation", 0) > self.generation
+        if not stale and VECTOR_BACKEND == "mmap" and self._vectors is None:
+            # Serving from Chroma until the export for this generation lands
+            stale = index_state.get("exported", -1) >= self.generation
+        if not stale:
+            return False
+
+        with self._lock:
+            # Release ChromaDB's SQLite handles and the mmap before swapping the volume view
+            self._vectors = self._collection = self.index = None
+            self._retrievers = {}
+            SharedSystemClient.clear_system_cache()
+            try:
+                rag_vol.reload()
+                reloaded = True
+            except Exception as e:
+                # e.g. files still open under /data; keep serving the current view for now
+                print(f"[SEARCH] volume reload failed, retrying in {INDEX_RELOAD_RETRY:.0f}s: {e}",
+                      file=sys.stderr, flush=True)
+                self._retry_at = now + INDEX_RELOAD_RETRY
+                reloaded = False
+            previous = self.generation
+            self._load_collection()
+        if not reloaded:
+            return False
+        print(f"[SEARCH] index generation {previous} -> {self.generation}", file=sys.stderr, flush=True)
+        return True
+
     def has_index(self) -> bool:
         """Check if any documents have been indexed."""
-        return self._collection.count() > 0
+        with self._lock:
+            if self._vectors is not None:
+                return len(self._vectors) > 0
+            return self._collection.count() > 0
+
+    def search(self, query: str, top_k: int = TOP_K) -> list:
+        """Return the top_k NodeWithScore results for query, served from cache when possible."""
+        self.refresh()
+        key = _normalize(query)
+        generation = self.generation
+        nodes = self._results.get((key, top_k, generation))
+        if nodes is not None:
+            return nodes
+        embedding = self.embed_query(query)
+        with self._lock:
+            generation = self.generation
+            if self._vectors is not None:
+                nodes = self._search_vectors(embedding, top_k)
+            else:
+                nodes = self._retriever(top_k).retrieve(QueryBundle(query_str=query, embedding=embedding))
+        self._results.put((key, top_k, generation), nodes)
+        return nodes
+
+    def embed_query(self, query: str) -> list[float]:
+        """Normalized bge query embedding, LRU-cached by normalized text."""
+        key = _normalize(query)
+        embedding = self._embeddings.get(key)
+        if embedding is None:
+            # bge's tokenizer lowercases anyway, so the key embeds like the raw query
+            embedding = self.embed_model.get_query_embedding(key)
+            self._embeddings.put(key, embedding)
+        return embedding
+
+    def cache_stats(self) -> dict:
+        """Hit/miss counts and hit rates for the embedding and result caches."""
+        return {
+            "generation": self.generation,
+            "encoder": {"mode": QUERY_ENCODER, **(self.encoder_check or {})},
+            "embeddings": self._embeddings.stats(),
+            "results": self._results.stats(),
+        }
+
+    def _check_encoder(self) -> None:
+        """Compare the CPU query encoder against the GPU vectors already in the index."""
+        check = validate(self.embed_model, self._collection)
+        if not check["n"]:
+            return
+        self.encoder_check = check
+        ok = check["min_cosine"] >= QUERY_ENCODER_MIN_COSINE
+        print(
+            f"[SEARCH] {QUERY_ENCODER} encoder vs index vectors: min cosine {check['min_cosine']:.4f}, "
+            f"mean {check['mean_cosine']:.4f} over {check['n']} chunks"
+            + ("" if ok else f" — below {QUERY_ENCODER_MIN_COSINE}, recall may drop"),
+            file=sys.stderr, flush=True,
+        )
+
+    def _search_vectors(self, embedding: list[float], top_k: int) -> list[NodeWithScore]:
+        hits = self._vectors.search(embedding, top_k)
+        chunks = self._vectors.chunks([row for row, _ in hits])
+        return [
+            NodeWithScore(node=TextNode(id_=chunk_id, text=text, metadata=metadata), score=score)
+            for (_, score), (chunk_id, text, metadata) in zip(hits, chunks)
+        ]
+
+    def _retriever(self, top_k: int):
+        with self._lock:
+            if top_k not in self._retrievers:
+                self._retrievers[top_k] = self.index.as_retriever(similarity_top_k=top_k)
+            return self._retrievers[top_k]
+
+
+# ── Helpers ───────────────────────────────────────────────────────────────────
+
+def _read_generation() -> int:
+    try:
+        return int(INDEX_GENERATION_PATH.read_text())
+    except (FileNotFoundError, ValueError):
+        return 0
+
+
+def _normalize(query: str) -> str:
+    """Case- and whitespace-insensitive cache key."""
+    return " ".join(query.lower().split())
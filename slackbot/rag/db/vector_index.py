@@ -0,0 +1,93 @@
+"""Memory-mapped flat/IVF vector index exported by the index pipeline.
+
+Opens VECTORS_DIR/<generation>/ (see index_pipeline's upsert_worker
+exporter for the layout). Vectors stay on the volume and are paged in by
+the OS; top-k is a blocked matrix-vector product, restricted to the
+nprobe nearest IVF lists when the export is partitioned.
+"""
+
+import json
+import sqlite3
+from pathlib import Path
+
+import numpy as np
+
+from ..config import IVF_NPROBE, VECTORS_DIR
+
+# Rows scored per matmul in a flat scan — bounds the temporary score buffer
+_SCAN_BLOCK = 262_144
+
+
+class VectorIndex:
+    """Read-only top-k over vectors.npy plus a row → chunk lookup table."""
+
+    def __init__(self, path: Path, nprobe: int = IVF_NPROBE):
+        self.path = Path(path)
+        self._nprobe = nprobe
+        self._vectors = np.load(self.path / "vectors.npy", mmap_mode="r")
+        if (self.path / "centroids.npy").exists():
+            self._centroids = np.load(self.path / "centroids.npy")
+            self._offsets = np.load(self.path / "offsets.npy")
+        else:
+            self._centroids = self._offsets = None
+        self._db = self.path / "chunks.sqlite"
+
+    @classmethod
+    def open(cls, generation: int, root: Path = VECTORS_DIR) -> "VectorIndex | None":
+        """Open the export for generation, or None if the pipeline hasn't written it."""
+        path = Path(root) / f"{generation:08d}"
+        return cls(path) if (path / "vectors.npy").exists() else None
+
+    def __len__(self) -> int:
+        return len(self._vectors)
+
+    def search(self, embedding, top_k: int) -> list[tuple[int, float]]:
+        """Return (row, score) pairs for the top_k rows by cosine similarity."""
+        query = np.asarray(embedding, dtype=np.float32)
+        query /= max(float(np.linalg.norm(query)), 1e-12)
+        if self._centroids is None:
+            ranges = [(0, len(self._vectors))]
+        else:
+            probe = _top(self._centroids @ query, self._nprobe)
+            ranges = [(int(self._offsets[i]), int(self._offsets[i + 1])) for i in probe]
+
+        rows, scores = [], []
+        for start, end in ranges:
+            for i in range(start, end, _SCAN_BLOCK):
+                block = self._vectors[i : min(i + _SCAN_BLOCK, end)] @ query
+                best = _top(block, top_k)
+                rows.append(best + i)
+                scores.append(block[best])
+        if not rows:
+            return []
+        rows, scores = np.concatenate(rows), np.concatenate(scores)
+        best = _top(scores, top_k)
+        return [(int(rows[i]), float(scores[i])) for i in best]
+
+    def chunks(self, rows: list[int]) -> list[tuple[str, str, dict]]:
+        """(chunk id, text, metadata) for each row, in the given order."""
+        if not rows:
+            return []
+        uri = f"file:{self._db}?mode=ro"
+        conn = sqlite3.connect(uri, uri=True)
+        try:
+            found = {
+                row: (chunk_id, text, json.loads(metadata))
+                for row, chunk_id, text, metadata in conn.execute(
+                    f"SELECT row, id, text, metadata FROM chunks WHERE row IN ({','.join('?' * len(rows))})",
+                    rows,
+                )
+            }
+        finally:
+            conn.close()
+        return [found[r] for r in rows]
+
+
+# ── Helpers ───────────────────────────────────────────────────────────────────
+
+def _top(scores, k: int):
+    """Indices of the k largest scores, best first."""
+    if k >= len(scores):
+        return np.argsort(-scores)
+    part = np.argpartition(-scores, k)[:k]
+    return part[np.argsort(-scores[part])]
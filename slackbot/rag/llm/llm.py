@@ -9,7 +9,7 @@ import time
 import requests
 from llama_index.llms.openai_like import OpenAILike
 
-from ..config import LLM_CONTEXT_WINDOW, VLLM_MODEL
+from ..config import LLM_CONTEXT_WINDOW, VLLM_MAX_NUM_SEQS, VLLM_MODEL
 
 _PORT = 8000
 _BASE_URL = f"http://localhost:{_PORT}/v1"
@@ -43,6 +43,9 @@ class LLM:
             top_p=0.8,
             is_chat_model=True,
             context_window=LLM_CONTEXT_WINDOW,
+            # Final stream chunk carries token counts for the query profiler
+            # (llama-index drops this for non-streaming calls)
+            additional_kwargs={"stream_options": {"include_usage": True}},
         )
 
     def start(self):
@@ -58,6 +61,16 @@ class LLM:
         self._wait_ready()
         print("[LLM] Ready.", file=sys.stderr, flush=True)
 
+    def prefix_cache_stats(self) -> dict:
+        """Prompt tokens looked up in / served from vLLM's prefix cache since start."""
+        totals = {"queries": 0.0, "hits": 0.0}
+        for line in requests.get(f"http://localhost:{_PORT}/metrics", timeout=5).text.splitlines():
+            name = line.split("{")[0].split(" ")[0].removesuffix("_total")
+            if name in ("vllm:prefix_cache_queries", "vllm:prefix_cache_hits"):
+                totals[name.rsplit("_", 1)[1]] += float(line.rsplit(" ", 1)[1])
+        totals["hit_rate"] = totals["hits"] / totals["queries"] if totals["queries"] else 0.0
+        return totals
+
     def terminate(self):
         if self._proc is not None:
             self._proc.terminate()
@@ -77,7 +90,9 @@ class LLM:
             "--max-model-len", str(LLM_CONTEXT_WINDOW),
             "--enforce-eager",
             "--enable-sleep-mode",
-            "--max-num-seqs", "4",
+            "--max-num-seqs", str(VLLM_MAX_NUM_SEQS),
+            # Reuses KV for the shared system/tools/thread-history prompt prefix
+            "--enable-prefix-caching",
         ]
         print("[LLM] Starting vLLM...", file=sys.stderr, flush=True)
         self._proc = subprocess.Popen(cmd, stdout=sys.stderr, stderr=subprocess.PIPE, text=True)
@@ -0,0 +1,143 @@
+"""Request scheduler — one event loop per container, bounded admission.
+
+Every query runs on a single long-lived loop thread instead of its own
+asyncio.run(). At most max_running queries talk to vLLM at once (matching
+--max-num-seqs); up to max_queued more wait in FIFO order, and anything
+beyond that is refused immediately with Busy rather than timing out.
+Each request has a deadline covering both its wait and its run; requests
+that hit it count as expired, streams the caller stops reading early as
+abandoned. The deadline cancels the request's coroutine only: a tool call
+already running in an executor thread carries on until it returns, which
+is why execute_python has its own timeout.
+"""
+
+import asyncio
+import collections
+import contextlib
+import queue
+import sys
+import threading
+import time
+from typing import AsyncIterator, Awaitable, Callable, Iterator
+
+from slackbot.wait_window import WaitWindow
+
+from .config import RAG_MAX_QUEUED, RAG_REQUEST_DEADLINE, VLLM_MAX_NUM_SEQS
+
+_END = object()
+
+
+class Busy(Exception):
+    """The admission queue is full."""
+
+
+class Scheduler:
+    """Thread-safe: call run()/stream() from any thread; work runs on the shared loop."""
+
+    def __init__(self, max_running: int = VLLM_MAX_NUM_SEQS, max_queued: int = RAG_MAX_QUEUED,
+                 deadline: float = RAG_REQUEST_DEADLINE):
+        self._max_running = max_running
+        self._max_queued = max_queued
+        self._deadline = deadline
+        self._loop = asyncio.new_event_loop()
+        threading.Thread(target=self._loop.run_forever, daemon=True).start()
+        asyncio.run_coroutine_threadsafe(self._open(), self._loop).result()
+        self.running = self.queued = 0
+        self._counts = collections.Counter()
+        self._waits = WaitWindow()
+
+    def run(self, make_coro: Callable[[], Awaitable], deadline: float | None = None):
+        """Admit, then await make_coro() on the loop. Blocks the calling thread.
+
+        Raises Busy if the queue is full and TimeoutError past the deadline.
+        """
+        return asyncio.run_coroutine_threadsafe(self._run(make_coro, deadline), self._loop).result()
+
+    def stream(self, make_agen: Callable[[], AsyncIterator], deadline: float | None = None) -> Iterator:
+        """Admit, then iterate make_agen() on the loop, yielding its items to the calling thread."""
+        items: queue.Queue = queue.Queue()
+        future = asyncio.run_coroutine_threadsafe(self._pump(make_agen, deadline, items), self._loop)
+        finished = False
+        try:
+            while (item := items.get()) is not _END:
+                yield item
+            finished = True
+        finally:
+            if not finished:
+                # Caller stopped early: don't keep holding a slot for nobody
+                future.cancel()
+        # Re-raises Busy/TimeoutError/agent errors from the loop
+        future.result()
+
+    def metrics(self) -> dict:
+        return {
+            "running": self.running,
+            "queued": self.queued,
+            "max_running": self._max_running,
+            "max_queued": self._max_queued,
+            **self._counts,
+            **self._waits.percentiles(),
+        }
+
+    async def _open(self) -> None:
+        # Created on the loop thread so it binds to the shared loop
+        self._slots = asyncio.Semaphore(self._max_running)
+
+    async def _run(self, make_coro, deadline):
+        async with self._deadline_scope(deadline):
+            async with self._admit():
+                return await make_coro()
+
+    async def _pump(self, make_agen, deadline, items: queue.Queue) -> None:
+        try:
+            async with self._deadline_scope(deadline):
+                async with self._admit():
+                    async for item in make_agen():
+                        items.put(item)
+        finally:
+            items.put(_END)
+
+    @contextlib.asynccontextmanager
+    async def _deadline_scope(self, deadline: float | None):
+        """Apply the request deadline; count requests that hit it and ones cancelled by the caller.
+
+        Cancellation stops the awaiting coroutine, not sync tool calls already
+        running in threads — those finish (or hit their own timeout) in the background.
+        """
+        scope = asyncio.timeout(deadline or self._deadline)
+        try:
+            async with scope:
+                yield
+        except TimeoutError:
+            if scope.expired():
+                self._counts["expired"] += 1
+            raise
+        except asyncio.CancelledError:
+            # stream() cancels when its caller stops reading
+            self._counts["abandoned"] += 1
+            raise
+
+    @contextlib.asynccontextmanager
+    async def _admit(self):
+        """Hold one running slot, waiting FIFO for it unless the queue is already full."""
+        if self._slots.locked() and self.queued >= self._max_queued:
+            self._counts["rejected"] += 1
+            raise Busy(f"{self.running} running, {self.queued} queued")
+        self.queued += 1
+        start = time.monotonic()
+        try:
+            await self._slots.acquire()
+        finally:
+            self.queued -= 1
+        wait = time.monotonic() - start
+        self._waits.add(wait)
+        self._counts["admitted"] += 1
+        if wait > 1.0:
+            print(f"[SCHED] admitted after {wait:.1f}s ({self.running + 1} running, {self.queued} queued)",
+                  file=sys.stderr, flush=True)
+        self.running += 1
+        try:
+            yield
+        finally:
+            self.running -= 1
+            self._slots.release()
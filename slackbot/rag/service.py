@@ -4,9 +4,14 @@ Models are cached on the rag volume. First deploy downloads them (~4 min),
 subsequent cold starts restore from GPU snapshot (~1s).
 """
 
+import shutil
+import threading
+from pathlib import Path
+
 import modal
 
 from slackbot.modal_app import app, rag_vol
+from slackbot.rag.config import INLINE_FILE_MAX_BYTES, OUTPUT_DIR, RAG_MAX_QUEUED, VLLM_MAX_NUM_SEQS
 
 # -- GPU image: CUDA + vLLM + LlamaIndex + doc parsing libs --
 
@@ -50,7 +55,9 @@ image = (
     experimental_options={"enable_gpu_snapshot": True},
     startup_timeout=600,
 )
-@modal.concurrent(max_inputs=5)
+# Exactly the scheduler's running + queued requests: once a container is full, Modal
+# scales out rather than handing it inputs the scheduler would refuse as busy
+@modal.concurrent(max_inputs=VLLM_MAX_NUM_SEQS + RAG_MAX_QUEUED)
 class RagService:
     """Local LLM RAG agent with GPU memory snapshot lifecycle."""
 
@@ -59,17 +66,29 @@ class RagService:
     @modal.enter(snap=True)
     def load(self):
         """Load LLM and search index, then start vLLM (sleeps for snapshot automatically)."""
-        from slackbot.rag.db import SearchIndex
+        from slackbot.rag.agent import Sessions
+        from slackbot.rag.db import AnswerCache, SearchIndex
         from slackbot.rag.llm import LLM
 
         self._llm = LLM()
         self._search_index = SearchIndex()
+        self._answers = AnswerCache()
+        self._sessions = Sessions()
         self._llm.start()  # starts vLLM subprocess, warms up, then sleeps weights to CPU
 
     @modal.enter(snap=False)
     def wake_up(self):
         """After snapshot restore: reconnect ChromaDB (stale from snapshot), wake GPU."""
+        from slackbot.rag.agent import InterpreterPool
+        from slackbot.rag.scheduler import Scheduler
+
+        # Started after restore so its loop thread isn't part of the snapshot
+        self._scheduler = Scheduler()
+        # Fork server for execute_python; its imports overlap with the GPU wake-up
+        self._interpreter = InterpreterPool()
+        threading.Thread(target=self._interpreter.warm, daemon=True).start()
         self._search_index.reload()
+        self._answers.load()
         self._llm.wake_up()
 
     @modal.exit()
@@ -79,10 +98,167 @@ class RagService:
     # -- Interface --
 
     @modal.method()
-    def query(self, message: str) -> tuple[str, list[str]]:
-        """Run a RAG query. Returns (response_text, output_file_paths)."""
-        import asyncio
-        from slackbot.rag.agent import parse_response, run_query
+    def query(self, message: str, use_cache: bool = True,
+              session_id: str | None = None) -> tuple[str, list[dict], dict]:
+        """Run a RAG query. Returns (response_text, attachments, profile).
+
+        Each attachment is {"name", "content": bytes} for output files up to
+        INLINE_FILE_MAX_BYTES, else {"name", "path"} on the rag volume.
+
+        Earlier turns of session_id (the Slack thread) are replayed as chat
+        history. A first-turn paraphrase of an earlier question against the
+        same index generation is answered from the answer cache unless
+        use_cache=False. Otherwise the query waits for a scheduler slot, or
+        gets a busy reply. The profile is the per-step latency breakdown
+        also appended to PROFILE_LOG.
+        """
+        from slackbot.rag.agent import QueryProfile, run_query
+        from slackbot.rag.config import BUSY_REPLY, TIMEOUT_REPLY
+        from slackbot.rag.scheduler import Busy
+
+        profile = QueryProfile(message)
+        history = self._sessions.history(session_id)
+        embedding, generation, cached = self._lookup(message, use_cache and not history)
+        if cached:
+            text, output_files = cached
+            # Recorded like a generated answer, so follow-ups in the thread see this turn
+            self._sessions.record(session_id, message, text)
+            return text, self._attachments(output_files), profile.finish(outcome="cached")
+
+        prefix_before = self._prefix_cache_stats()
+        try:
+            text, output_files, profile_dict = self._scheduler.run(lambda: run_query(
+                message, llm=self._llm, search_index=self._search_index, chat_history=history, profile=profile,
+                interpreter=self._interpreter,
+            ))
+        except Busy:
+            return BUSY_REPLY, [], profile.finish(outcome="busy")
+        except TimeoutError:
+            return TIMEOUT_REPLY, [], profile.finish(outcome="timeout")
+        self._log_prefix_reuse(prefix_before)
+        text, output_files = self._store(message, embedding, generation, session_id, history, text, output_files)
+        return text, self._attachments(output_files), profile_dict
+
+    @modal.method()
+    def query_stream(self, message: str, use_cache: bool = True, session_id: str | None = None):
+        """Streaming query(): yields ("status", text) as tools run, ("token", delta)
+        as the final answer generates, then ("done", (response_text, attachments, profile)).
+        """
+        from slackbot.rag.agent import QueryProfile, stream_query
+        from slackbot.rag.config import BUSY_REPLY, TIMEOUT_REPLY
+        from slackbot.rag.scheduler import Busy
+
+        profile = QueryProfile(message)
+        history = self._sessions.history(session_id)
+        embedding, generation, cached = self._lookup(message, use_cache and not history)
+        if cached:
+            text, output_files = cached
+            self._sessions.record(session_id, message, text)
+            yield "done", (text, self._attachments(output_files), profile.finish(outcome="cached"))
+            return
+
+        prefix_before = self._prefix_cache_stats()
+        try:
+            events = self._scheduler.stream(lambda: stream_query(
+                message, llm=self._llm, search_index=self._search_index, chat_history=history, profile=profile,
+                interpreter=self._interpreter,
+            ))
+            for kind, value in events:
+                if kind == "done":
+                    self._log_prefix_reuse(prefix_before)
+                    text, output_files, profile_dict = value
+                    text, output_files = self._store(
+                        message, embedding, generation, session_id, history, text, output_files,
+                    )
+                    value = (text, self._attachments(output_files), profile_dict)
+                yield kind, value
+        except Busy:
+            yield "done", (BUSY_REPLY, [], profile.finish(outcome="busy"))
+        except TimeoutError:
+            yield "done", (TIMEOUT_REPLY, [], profile.finish(outcome="timeout"))
+
+    @modal.method()
+    def stats(self) -> dict:
+        """Cache hit rates, sessions and scheduler queue depth/wait times for this container."""
+        return {
+            **self._search_index.cache_stats(),
+            "answers": self._answers.stats(),
+            "prefix_cache": self._prefix_cache_stats(),
+            "sessions": len(self._sessions),
+            "scheduler": self._scheduler.metrics(),
+        }
+
+    # -- Answer cache and sessions --
+
+    def _lookup(self, message: str, use_cache: bool):
+        """Return (embedding, generation, cached answer or None) for message."""
+        # Pick up anything indexed since the last query before keying the answer cache
+        self._search_index.refresh()
+        embedding = self._search_index.embed_query(message)
+        generation = self._search_index.generation
+        cached = self._answers.lookup(embedding, generation) if use_cache else None
+        return embedding, generation, cached
+
+    def _store(self, message: str, embedding, generation: int, session_id: str | None, history: list,
+               text: str, output_files: list[str]):
+        self._sessions.record(session_id, message, text)
+        # Follow-ups depend on their thread's history, so only first turns are reusable
+        if text and not history:
+            request_files = output_files
+            output_files = self._answers.store(message, embedding, generation, text, output_files)
+            # The cache holds copies now; the request's own output dir is no longer needed
+            if request_files:
+                shutil.rmtree(Path(request_files[0]).parent, ignore_errors=True)
+        return text, output_files
+
+    # -- Output files --
+
+    @staticmethod
+    def _attachments(output_files: list[str]) -> list[dict]:
+        """Inline small files as bytes so the bot needn't wait on a volume sync to read them.
+
+        Inlined files are deleted from the request's output dir here; whatever
+        is left (large files) the bot removes after uploading.
+        """
+        attachments, request_dirs = [], set()
+        for p in map(Path, output_files):
+            try:
+                size = p.stat().st_size
+            except OSError:
+                continue
+            if size > INLINE_FILE_MAX_BYTES:
+                attachments.append({"name": p.name, "path": str(p)})
+                continue
+            attachments.append({"name": p.name, "content": p.read_bytes()})
+            if p.parent.parent == OUTPUT_DIR:
+                p.unlink(missing_ok=True)
+                request_dirs.add(p.parent)
+        for d in request_dirs:
+            try:
+                d.rmdir()
+            except OSError:
+                pass  # Still holds large files
+        return attachments
+
+    # -- vLLM prefix cache --
+
+    def _prefix_cache_stats(self) -> dict:
+        try:
+            return self._llm.prefix_cache_stats()
+        except Exception as e:
+            print(f"[LLM] prefix cache metrics unavailable: {e}", flush=True)
+            return {"queries": 0.0, "hits": 0.0, "hit_rate": 0.0}
+
+    def _log_prefix_reuse(self, before: dict) -> None:
+        """Print prompt tokens served from the prefix cache while this query ran.
 
-        response = asyncio.run(run_query(message, llm=self._llm, search_index=self._search_index))
-        return parse_response(response)
+        Container-wide counters, so concurrent queries share the delta.
+        """
+        after = self._prefix_cache_stats()
+        queries, hits = after["queries"] - before["queries"], after["hits"] - before["hits"]
+        if queries > 0:
+            print(
+                f"[LLM] prefix cache: {hits:,.0f} of {queries:,.0f} prompt tokens reused ({hits / queries:.0%}); "
+                f"{after['hit_rate']:.0%} since start",
+                flush=True,
+            )
@@ -1,3 +1,5 @@
+from .dispatcher import BUSY_REPLY, Dispatcher
+from .idempotency import IdempotencyCache
 from .router import Router
 
-__all__ = ["Router"]
+__all__ = ["Router", "Dispatcher", "BUSY_REPLY", "IdempotencyCache"]
@@ -0,0 +1,106 @@
+"""Dispatcher — bounded worker pool between Slack events and Router.handle.
+
+Events queue per channel and a fixed set of workers takes them round-robin
+across channels, so one busy channel (a burst of mentions, a 30-file
+upload) can't starve the rest. Past the queue limits submit() refuses and
+the caller replies busy, instead of starting a thread per event.
+"""
+
+import collections
+import threading
+import time
+from typing import Callable
+
+from slackbot.wait_window import WaitWindow
+
+WORKERS = 8
+MAX_QUEUED = 64
+MAX_QUEUED_PER_CHANNEL = 8
+BUSY_REPLY = "I'm handling too many requests right now — please try again in a minute."
+
+
+class Dispatcher:
+    """Thread-safe: submit() from any thread. start() once, after snapshot restore."""
+
+    def __init__(self, handle: Callable[[dict, object], None], workers: int = WORKERS,
+                 max_queued: int = MAX_QUEUED, max_per_channel: int = MAX_QUEUED_PER_CHANNEL):
+        self._handle = handle
+        self._workers = workers
+        self._max_queued = max_queued
+        self._max_per_channel = max_per_channel
+        self._queues: dict[str, collections.deque] = {}
+        # Channels with queued events, in the order they get their next turn
+        self._turns: collections.deque[str] = collections.deque()
+        self._cond = threading.Condition()
+        self.running = self.queued = 0
+        self._counts = collections.Counter()
+        self._waits = WaitWindow()
+
+    def start(self) -> None:
+        for i in range(self._workers):
+            threading.Thread(target=self._work, name=f"dispatch-{i}", daemon=True).start()
+
+    def submit(self, event: dict, client) -> bool:
+        """Queue event for handling; False if its channel's queue or the total is full."""
+        channel = event["channel"]
+        with self._cond:
+            queue = self._queues.get(channel)
+            if self.queued >= self._max_queued or (queue and len(queue) >= self._max_per_channel):
+                self._counts["rejected"] += 1
+                print(f"[dispatch] busy: rejected event in {channel} "
+                      f"({self.running} running, {self.queued} queued)", flush=True)
+                return False
+            if queue is None:
+                queue = self._queues[channel] = collections.deque()
+                self._turns.append(channel)
+            queue.append((time.monotonic(), event, client))
+            self.queued += 1
+            self._counts["accepted"] += 1
+            self._cond.notify()
+        return True
+
+    def metrics(self) -> dict:
+        with self._cond:
+            per_channel = {channel: len(queue) for channel, queue in self._queues.items()}
+        return {
+            "running": self.running,
+            "queued": self.queued,
+            "queued_by_channel": per_channel,
+            "workers": self._workers,
+            "max_queued": self._max_queued,
+            "max_queued_per_channel": self._max_per_channel,
+            **self._counts,
+            **self._waits.percentiles(),
+        }
+
+    def _next(self) -> tuple[str, float, dict, object]:
+        """Block for the next event, taking channels in turn."""
+        with self._cond:
+            while not self._turns:
+                self._cond.wait()
+            channel = self._turns.popleft()
+            queue = self._queues[channel]
+            queued_at, event, client = queue.popleft()
+            if queue:
+                self._turns.append(channel)
+            else:
+                del self._queues[channel]
+            self.queued -= 1
+            self.running += 1
+            wait = time.monotonic() - queued_at
+            self._waits.add(wait)
+        return channel, wait, event, client
+
+    def _work(self) -> None:
+        while True:
+            channel, wait, event, client = self._next()
+            if wait > 1.0:
+                print(f"[dispatch] {channel} event waited {wait:.1f}s "
+                      f"({self.running} running, {self.queued} queued)", flush=True)
+            try:
+                self._handle(event, client)
+            except Exception as e:
+                print(f"[dispatch] handler error: {e}", flush=True)
+            finally:
+                with self._cond:
+                    self.running -= 1
@@ -0,0 +1,55 @@
+"""Idempotency cache — handle each Slack event once, however often it's delivered.
+
+Slack redelivers an event when it doesn't get a 200 within 3s (a cold
+start, a slow ack). A retry of an event that was already accepted is
+dropped, so the same vLLM query or index job never runs twice; a retry
+of one that was never accepted (the first delivery really failed) is
+handled normally. Keys are the envelope's event_id and the message's
+client_msg_id, kept for EVENT_TTL, well past Slack's last retry (~5 min).
+Per container: Bot normally runs as one warm container.
+"""
+
+import collections
+import threading
+import time
+
+EVENT_TTL = 60 * 60
+MAX_EVENTS = 10_000
+
+
+class IdempotencyCache:
+    """Thread-safe set of recently accepted event keys, oldest first."""
+
+    def __init__(self, ttl: float = EVENT_TTL, max_entries: int = MAX_EVENTS):
+        self._ttl = ttl
+        self._max_entries = max_entries
+        self._seen: collections.OrderedDict[str, float] = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self._counts = collections.Counter()
+
+    def accept(self, *keys: str | None, retry: int = 0) -> bool:
+        """Record keys and return True, unless any of them was accepted within the TTL."""
+        keys = [k for k in keys if k]
+        now = time.monotonic()
+        with self._lock:
+            self._expire(now)
+            if any(k in self._seen for k in keys):
+                self._counts["duplicates"] += 1
+                return False
+            for k in keys:
+                self._seen[k] = now
+            while len(self._seen) > self._max_entries:
+                self._seen.popitem(last=False)
+            self._counts["accepted"] += 1
+            if retry:
+                # Slack retried an event whose first delivery never reached us
+                self._counts["retries_accepted"] += 1
+        return True
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"size": len(self._seen), **self._counts}
+
+    def _expire(self, now: float) -> None:
+        while self._seen and next(iter(self._seen.values())) < now - self._ttl:
+            self._seen.popitem(last=False)
@@ -1,10 +1,21 @@
 """Handle file uploads — download to volume and trigger indexing."""
 
 import os
-import urllib.request
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 _DOCS_DIR = Path("/data/rag/docs")
+# Partial downloads; on the same volume as _DOCS_DIR so the final rename is atomic
+_TMP_DIR = Path("/data/rag/.downloads")
+
+# Concurrent downloads, and connections in the pooled HTTP client they share
+DOWNLOAD_CONCURRENCY = 4
+# Slack's own upload limit is 1 GB
+MAX_FILE_BYTES = 1024 ** 3
+_CHUNK_BYTES = 1024 * 1024
 
 
 class IndexHandler:
@@ -13,30 +24,104 @@ class IndexHandler:
     def __init__(self, indexer, vol):
         self._indexer = indexer
         self._vol = vol
+        self._http = None
+        self._http_lock = threading.Lock()
 
     def handle(self, files: list[dict], say) -> None:
-        saved = self._download(files)
+        start = time.monotonic()
+        saved, skipped, total_bytes = self._download(files)
         self._vol.commit()
+        if skipped:
+            say(f"Skipped {len(skipped)} file(s): {', '.join(skipped)}")
         if not saved:
-            say("No downloadable files found in the shared items.")
+            if not skipped:
+                say("No downloadable files found in the shared items.")
             return
-        say(f"Saved {len(saved)} file(s): {', '.join(saved)}")
+        elapsed = max(time.monotonic() - start, 1e-6)
+        say(f"Saved {len(saved)} file(s) ({total_bytes / 1e6:.1f} MB at {total_bytes / 1e6 / elapsed:.1f} MB/s): "
+            f"{', '.join(saved)}")
         self._index(say)
 
-    def _download(self, files: list[dict]) -> list[str]:
+    def _download(self, files: list[dict]) -> tuple[list[str], list[str], int]:
+        """Fetch files concurrently; returns (saved names, skipped with reasons, bytes saved)."""
         _DOCS_DIR.mkdir(parents=True, exist_ok=True)
-        saved = []
+        _TMP_DIR.mkdir(parents=True, exist_ok=True)
+        jobs, skipped = [], []
         for f in files:
             url = f.get("url_private_download") or f.get("url_private")
             if not url:
                 continue
             filename = f.get("name", f["id"])
-            req = urllib.request.Request(url)
-            req.add_header("Authorization", f"Bearer {os.environ['SLACK_BOT_TOKEN']}")
-            with urllib.request.urlopen(req, timeout=120) as resp:
-                (_DOCS_DIR / filename).write_bytes(resp.read())
-            saved.append(filename)
-        return saved
+            if f.get("size", 0) > MAX_FILE_BYTES:
+                skipped.append(f"{filename} (over {MAX_FILE_BYTES // 1024 ** 2} MB)")
+                continue
+            jobs.append((url, filename))
+        if not jobs:
+            return [], skipped, 0
+
+        with ThreadPoolExecutor(max_workers=DOWNLOAD_CONCURRENCY) as pool:
+            results = list(pool.map(lambda job: self._fetch(*job), jobs))
+        saved, total_bytes = [], 0
+        for (_, filename), (size, error) in zip(jobs, results):
+            if error:
+                skipped.append(f"{filename} ({error})")
+            else:
+                saved.append(filename)
+                total_bytes += size
+        if saved:
+            self._indexer.record_changes([str(_DOCS_DIR / name) for name in saved])
+        return saved, skipped, total_bytes
+
+    def _fetch(self, url: str, filename: str) -> tuple[int, str | None]:
+        """Stream url to a temp file, then rename it into _DOCS_DIR. Returns (bytes, error)."""
+        import httpx
+
+        start = time.monotonic()
+        fd, tmp = tempfile.mkstemp(dir=_TMP_DIR, suffix=".part")
+        size = 0
+        try:
+            with os.fdopen(fd, "wb") as out, self._client().stream("GET", url) as resp:
+                resp.raise_for_status()
+                if int(resp.headers.get("content-length", 0)) > MAX_FILE_BYTES:
+                    return 0, f"over {MAX_FILE_BYTES // 1024 ** 2} MB"
+                for chunk in resp.iter_bytes(_CHUNK_BYTES):
+                    size += len(chunk)
+                    if size > MAX_FILE_BYTES:
+                        return 0, f"over {MAX_FILE_BYTES // 1024 ** 2} MB"
+                    out.write(chunk)
+            os.replace(tmp, _DOCS_DIR / filename)
+        # HTTPError covers truncated bodies (RemoteProtocolError, ReadError); StreamError and
+        # InvalidURL sit outside it, and any of them should only skip this one file
+        except (httpx.HTTPError, httpx.StreamError, httpx.InvalidURL, OSError) as e:
+            print(f"[index] download of {filename} failed: {e!r}", flush=True)
+            if isinstance(e, httpx.HTTPStatusError):
+                return 0, f"HTTP {e.response.status_code}"
+            return 0, str(e) or type(e).__name__
+        finally:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+        elapsed = max(time.monotonic() - start, 1e-6)
+        print(f"[index] downloaded {filename}: {size / 1e6:.1f} MB in {elapsed:.1f}s "
+              f"({size / 1e6 / elapsed:.1f} MB/s)", flush=True)
+        return size, None
+
+    def _client(self):
+        """One pooled HTTP client for all downloads, created on first use."""
+        import httpx
+
+        with self._http_lock:
+            if self._http is None:
+                self._http = httpx.Client(
+                    headers={"Authorization": f"Bearer {os.environ['SLACK_BOT_TOKEN']}"},
+                    follow_redirects=True,
+                    # Connections are shared across events, so waiting for one isn't an error
+                    timeout=httpx.Timeout(120.0, pool=None),
+                    limits=httpx.Limits(max_connections=DOWNLOAD_CONCURRENCY),
+                )
+            return self._http
+
+    def compact(self, say) -> None:
+        say(self._indexer.compact())
 
     def _index(self, say) -> None:
         result = self._indexer.index()
@@ -1,7 +1,15 @@
-"""Handle RAG queries — call the remote LLM and upload output files."""
+"""Handle RAG queries — stream the remote LLM's answer and upload output files."""
 
+import shutil
+import time
 from pathlib import Path
 
+from slackbot.rag.config import OUTPUT_DIR
+
+# Minimum seconds between chat_update calls (Slack allows ~1 per second per message)
+UPDATE_INTERVAL = 1.0
+_CURSOR = " ▌"
+
 
 class RagHandler:
     """Query the RAG agent and upload any output files back to Slack."""
@@ -10,18 +18,75 @@ class RagHandler:
         self._rag = rag
         self._vol = vol
 
-    def handle(self, message: str, thread_ts: str, channel: str, say, client) -> None:
-        text, output_files = self._rag.query.remote(message)
-        say(text)
-        if output_files:
-            self._upload_files(output_files, channel, thread_ts, client)
-
-    def _upload_files(self, output_files: list[str], channel: str, thread_ts: str, client) -> None:
-        """Upload files generated by execute_python (charts, CSVs, etc.) to the thread."""
-        self._vol.reload()
-        for p in [Path(f) for f in output_files]:
-            if p.exists():
-                client.files_upload_v2(
-                    channel=channel, thread_ts=thread_ts,
-                    file=str(p), filename=p.name, title=p.name,
-                )
+    def handle(self, message: str, thread_ts: str, channel: str, say, client, use_cache: bool = True) -> None:
+        """Post a placeholder, then edit it in place as status and answer tokens stream in.
+
+        The Slack thread is the RAG session, so follow-ups see earlier turns.
+        """
+        placeholder = client.chat_postMessage(channel=channel, thread_ts=thread_ts, text="_Thinking…_")
+        reply = _ThrottledReply(client, channel, placeholder["ts"])
+        answer, text, attachments = "", "", []
+        try:
+            events = self._rag.query_stream.remote_gen(message, use_cache=use_cache, session_id=thread_ts)
+            for kind, value in events:
+                if kind == "status" and not answer:
+                    reply.update(f"_{value}_")
+                elif kind == "token":
+                    answer += value
+                    reply.update(answer + _CURSOR)
+                elif kind == "done":
+                    text, attachments, profile = value
+                    print(f"[rag] {profile.get('outcome')} in {profile.get('total_s', 0):.1f}s "
+                          f"({profile.get('iterations', 0)} iterations)", flush=True)
+        except Exception:
+            reply.update(answer or "_Query failed._", force=True)
+            raise
+        reply.update(text or "_No answer._", force=True)
+        if attachments:
+            self._upload_files(attachments, channel, thread_ts, client)
+
+    def _upload_files(self, attachments: list[dict], channel: str, thread_ts: str, client) -> None:
+        """Upload files generated by execute_python (charts, CSVs, etc.) to the thread.
+
+        Small files arrive inline as bytes; only larger ones need a volume
+        reload. All go up in one files_upload_v2 call, then the query's own
+        output directory is removed (answer-cache copies stay).
+        """
+        paths = [Path(a["path"]) for a in attachments if "path" in a]
+        if paths:
+            self._vol.reload()
+        uploads = [
+            {"file": a["content"] if "content" in a else a["path"], "filename": a["name"], "title": a["name"]}
+            for a in attachments if "content" in a or Path(a["path"]).exists()
+        ]
+        if uploads:
+            start = time.monotonic()
+            client.files_upload_v2(channel=channel, thread_ts=thread_ts, file_uploads=uploads)
+            print(f"[rag] uploaded {len(uploads)} file(s) ({len(paths)} via volume) "
+                  f"in {time.monotonic() - start:.1f}s", flush=True)
+        request_dirs = {p.parent for p in paths if p.parent.parent == OUTPUT_DIR}
+        for d in request_dirs:
+            shutil.rmtree(d, ignore_errors=True)
+        if request_dirs:
+            self._vol.commit()
+
+
+# ── Helpers ───────────────────────────────────────────────────────────────────
+
+class _ThrottledReply:
+    """Edit one Slack message at most every UPDATE_INTERVAL seconds, skipping no-op edits."""
+
+    def __init__(self, client, channel: str, ts: str, interval: float = UPDATE_INTERVAL):
+        self._client = client
+        self._channel = channel
+        self._ts = ts
+        self._interval = interval
+        self._sent_at = 0.0
+        self._text = ""
+
+    def update(self, text: str, force: bool = False) -> None:
+        now = time.monotonic()
+        if text == self._text or (not force and now - self._sent_at < self._interval):
+            return
+        self._client.chat_update(channel=self._channel, ts=self._ts, text=text)
+        self._sent_at, self._text = now, text
@@ -26,6 +26,10 @@ class Router:
         try:
             if event.get("files"):
                 self._index.handle(event["files"], say)
+            elif message.lower() == "index: compact":
+                self._index.compact(say)
+            elif message.lower().startswith("fresh:"):
+                self._rag.handle(message[6:].strip(), thread_ts, channel, say, client, use_cache=False)
             elif message.lower().startswith("hf:"):
                 self._ml.handle(message[3:].strip(), thread_ts, say)
             else:
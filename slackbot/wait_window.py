@@ -0,0 +1,26 @@
+"""Rolling window of queue wait times, shared by the Slack dispatcher and the RAG scheduler."""
+
+import collections
+import threading
+
+# Most recent waits kept for the percentiles
+WINDOW = 1_000
+
+
+class WaitWindow:
+    """Thread-safe: add() from workers, percentiles() from metrics()."""
+
+    def __init__(self, size: int = WINDOW):
+        self._waits: collections.deque[float] = collections.deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def add(self, seconds: float) -> None:
+        with self._lock:
+            self._waits.append(seconds)
+
+    def percentiles(self) -> dict:
+        """{"wait_p50_s", "wait_p99_s"} over the window; 0.0 before any waits."""
+        with self._lock:
+            waits = sorted(self._waits)
+        pct = lambda p: waits[min(int(p * len(waits)), len(waits) - 1)] if waits else 0.0
+        return {"wait_p50_s": pct(0.50), "wait_p99_s": pct(0.99)}
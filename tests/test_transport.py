@@ -0,0 +1,60 @@
+"""Round trip of ChunkBatch through pickle, as it travels between Modal workers."""
+
+import pickle
+
+import numpy as np
+import pytest
+
+from slackbot.index_pipeline.pipeline.transport import ChunkBatch
+
+N, DIM = 16, 8
+
+
+def _columns():
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((N, DIM)).astype("float32")
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    ids = [f"node-{i}" for i in range(N)]
+    texts = [f"chunk {i}" for i in range(N)]
+    metas = [{"source": "docs/report.pdf", "page_label": str(i)} for i in range(N)]
+    return ids, vectors, texts, metas
+
+
+@pytest.mark.parametrize("dtype, tol", [("float32", 0.0), ("float16", 1e-3)])
+def test_round_trip(dtype, tol):
+    ids, vectors, texts, metas = _columns()
+    batch = ChunkBatch.from_columns(ids, vectors.tolist(), texts, metas, dtype=dtype)
+    restored = pickle.loads(pickle.dumps(batch))
+    assert restored.ids == ids
+    assert restored.texts == texts
+    assert restored.metadatas == metas
+    assert restored.embeddings.dtype == dtype
+    assert restored.embeddings.shape == (N, DIM)
+    assert restored.float32().dtype == np.float32
+    assert np.abs(restored.float32() - vectors).max() <= tol
+
+
+def test_sliced_batch_round_trip():
+    ids, vectors, texts, metas = _columns()
+    batch = ChunkBatch.from_columns(ids, vectors, texts, metas)[3:11]
+    restored = pickle.loads(pickle.dumps(batch))
+    assert restored.ids == ids[3:11]
+    assert restored.texts == texts[3:11]
+    assert restored.metadatas == metas[3:11]
+    np.testing.assert_array_equal(restored.embeddings, vectors[3:11])
+
+
+def test_empty_batch_round_trip():
+    restored = pickle.loads(pickle.dumps(ChunkBatch.from_columns([], [], [], [])))
+    assert len(restored) == 0
+    assert restored.ids == restored.texts == restored.metadatas == []
+    assert restored.embeddings.shape == (0, 0)
+
+
+def test_concat_skips_empty_batches():
+    ids, vectors, texts, metas = _columns()
+    batch = ChunkBatch.from_columns(ids, vectors, texts, metas)
+    empty = ChunkBatch.from_columns([], [], [], [])
+    joined = pickle.loads(pickle.dumps(ChunkBatch.concat([batch[:5], empty, batch[5:]])))
+    assert joined.ids == ids
+    np.testing.assert_array_equal(joined.embeddings, vectors)